@@ -43,7 +43,8 @@ def create_app():
                 'health': '/health',
                 'auth': '/api/auth',
                 'analysis': '/api/analysis',
-                'dossier': '/api/dossier'
+                'dossier': '/api/dossier',
+                'analytics': '/api/analytics'
             }
         }
     
@@ -53,7 +54,7 @@ def create_app():
         return {'status': 'healthy', 'message': 'Gradalyze API is running'}
     
     # Register blueprints
-    from app.routes import auth, dossier, users, ocr_cert, ocr_tor, objective_1, objective_1_cs, objective_2, objective_3
+    from app.routes import auth, dossier, users, ocr_cert, ocr_tor, objective_1, objective_1_cs, objective_2, objective_3, analytics
     app.register_blueprint(auth.bp)
     app.register_blueprint(dossier.bp)
     app.register_blueprint(users.bp)
@@ -63,5 +64,41 @@ def create_app():
     app.register_blueprint(objective_1.bp)
     app.register_blueprint(objective_1_cs.bp)
     app.register_blueprint(objective_2.bp)
+    app.register_blueprint(analytics.bp)
+
+    # Optionally map model artifacts now, before a pre-forking server spawns workers
+    if os.getenv('MODEL_PREMAP', 'false').lower() == 'true':
+        from app.services.model_registry import get_model_registry
+        try:
+            report = get_model_registry().premap()
+            print(f"Pre-mapped model artifacts: {report}")
+        except Exception as e:
+            print(f"Warning: model pre-map failed: {e}")
+
+    # Load and exercise every career model so the first request pays no load cost
+    if os.getenv('MODEL_PREWARM', 'true').lower() == 'true':
+        from app.services.career_engine import get_career_engine
+        try:
+            report = get_career_engine().warm()
+            print(f"Warmed career models: {report}")
+        except Exception as e:
+            print(f"Warning: career model warm-up failed: {e}")
+
+    # Load the OCR readers now so the first TOR upload does not pay the model load
+    if os.getenv('OCR_PREWARM', 'false').lower() == 'true':
+        from app.services.ocr_pool import get_ocr_pool
+        try:
+            report = get_ocr_pool().warm()
+            print(f"Warmed OCR readers: {report}")
+        except Exception as e:
+            print(f"Warning: OCR reader warm-up failed: {e}")
+
+    # Queue a re-rank of stored recommendations whenever the company catalog changes
+    if os.getenv('RERANK_ON_CATALOG_CHANGE', 'false').lower() == 'true':
+        from app.services.recommendations import enable_rerank_on_catalog_change
+        try:
+            enable_rerank_on_catalog_change()
+        except Exception as e:
+            print(f"Warning: recommendation re-rank watcher failed to start: {e}")
     
     return app
@@ -0,0 +1,37 @@
+"""
+Admin analytics: archetype and career distributions per course and cohort.
+Served from materialized views, so a dashboard reads O(groups) rows.
+"""
+
+from flask import Blueprint, request, jsonify
+from app.routes.auth import token_required
+from app.services.analytics import cohort_analytics, get_analytics_refresher
+
+bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
+
+@bp.route('/cohorts', methods=['GET'])
+@token_required
+def get_cohort_analytics(current_user):
+    """Archetype distribution, average archetype percentages and top careers per course/cohort.
+    Query: course, cohort, top_jobs (default 10)."""
+    try:
+        course = (request.args.get('course') or '').strip() or None
+        cohort = (request.args.get('cohort') or '').strip() or None
+        top_jobs = max(1, min(40, int(request.args.get('top_jobs') or 10)))
+        groups = cohort_analytics(course=course, cohort=cohort, top_jobs=top_jobs)
+        return jsonify({
+            'groups': groups,
+            'count': len(groups),
+            'refresh': get_analytics_refresher().stats(),
+        }), 200
+    except Exception as e:
+        print(f"[ANALYTICS] Cohort analytics error: {e}")
+        return jsonify({'message': 'Failed to load cohort analytics', 'error': str(e)}), 500
+
+@bp.route('/refresh', methods=['POST'])
+@token_required
+def refresh_cohort_analytics(current_user):
+    """Refresh the analytics views now instead of waiting for the debounce window."""
+    result = get_analytics_refresher().refresh_now()
+    status = 200 if not result.get('last_error') else 502
+    return jsonify(result), status
@@ -6,12 +6,17 @@ Handles career prediction and analysis based on academic performance
 from flask import Blueprint, request, jsonify
 from app.services.supabase_client import get_supabase_client
 from app.routes.auth import token_required
-import json
 from datetime import datetime, timezone
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from joblib import dump, load
 import os
+from app.services.model_registry import get_model_registry
+from app.services.batch_users import load_batch_entries, persist_batch_results
+from app.services.jobs import get_job_manager
+from app.services.career_training import fit_forest, publish_career_model, load_hyperparams
+from app.services.career_engine import get_career_engine
+from app.services.forecast_cache import get_forecast_cache, forecast_unchanged
+from app.services.shadow import get_shadow_evaluator
+from app.services.analytics import get_analytics_refresher
 
 bp = Blueprint('objective_1', __name__, url_prefix='/api/objective-1')
 
@@ -31,38 +36,129 @@ JOBS_MASTER = [
 
 @bp.route('/bootstrap-model', methods=['POST'])
 def bootstrap_model():
-    """Create a lightweight decision-tree model and save it to dt_career.joblib.
+    """Queue a background job that trains a synthetic RandomForest and publishes dt_career.joblib.
     Intended for development to unblock Objective 1 when no model exists."""
     try:
         feature_len = int(request.args.get('feature_len') or 66)
-        n_samples = max(500, feature_len * 20)
+        job = get_job_manager().submit(
+            'bootstrap-model',
+            lambda job: _bootstrap_model_job(job, feature_len),
+            params={'program': 'it', 'feature_len': feature_len},
+        )
+        return jsonify({
+            'message': 'Model bootstrap queued (RandomForest)',
+            'job_id': job.id,
+            'status_url': f'{bp.url_prefix}/training-jobs/{job.id}',
+            'model_path': MODEL_PATH,
+        }), 202
+    except Exception as e:
+        return jsonify({'message': 'Bootstrap failed', 'error': str(e)}), 500
+
+def _bootstrap_model_job(job, feature_len: int):
+    n_samples = max(500, feature_len * 20)
+
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0.0, 4.0, size=(n_samples, feature_len)).astype(float)
+
+    # Build synthetic multi-target signals: weight groups of features to jobs
+    n_labels = len(JOBS_MASTER)
+    Y = np.zeros((n_samples, n_labels), dtype=float)
+
+    for j in range(n_labels):
+        # Each job emphasizes a sliding window of features
+        start = (j * 3) % max(1, feature_len - 5)
+        end = min(feature_len, start + 10)
+        weights = np.linspace(1.0, 2.0, end - start)
+        signal = (X[:, start:end] * weights).mean(axis=1)
+        # Add small noise to vary targets
+        Y[:, j] = signal + rng.normal(0, 0.05, size=n_samples)
+
+    model = fit_forest(X, Y, job=job, random_state=42, **load_hyperparams(MODEL_PATH, 120, 18))
+    return publish_career_model('it', model, JOBS_MASTER, MODEL_PATH)
+
+@bp.route('/training-jobs', methods=['GET'])
+def list_training_jobs():
+    """List recent background jobs (training, bootstrap) with their status."""
+    kind = request.args.get('kind') or None
+    return jsonify({'jobs': [j.to_dict() for j in get_job_manager().list(kind)]}), 200
+
+@bp.route('/training-jobs/<job_id>', methods=['GET'])
+def get_training_job(job_id):
+    """Return status/progress of a background job."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'message': 'Job not found', 'job_id': job_id}), 404
+    return jsonify(job.to_dict()), 200
 
-        rng = np.random.default_rng(42)
-        X = rng.uniform(0.0, 4.0, size=(n_samples, feature_len)).astype(float)
+@bp.route('/training-jobs/<job_id>/cancel', methods=['POST'])
+@token_required
+def cancel_training_job(current_user, job_id):
+    """Request cancellation; a running fit stops at its next tree slice."""
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({'message': 'Job not found', 'job_id': job_id}), 404
+    print(f"[OBJECTIVE-1] Cancellation of job {job_id} requested by {current_user}")
+    return jsonify(job.to_dict()), 202
 
-        # Build synthetic multi-target signals: weight groups of features to jobs
-        n_labels = len(JOBS_MASTER)
-        Y = np.zeros((n_samples, n_labels), dtype=float)
+@bp.route('/model-registry', methods=['GET'])
+def model_registry_stats():
+    """Return cache counters (hits, misses, load time) for loaded career models."""
+    return jsonify(get_model_registry().stats()), 200
 
-        for j in range(n_labels):
-            # Each job emphasizes a sliding window of features
-            start = (j * 3) % max(1, feature_len - 5)
-            end = min(feature_len, start + 10)
-            weights = np.linspace(1.0, 2.0, end - start)
-            signal = (X[:, start:end] * weights).mean(axis=1)
-            # Add small noise to vary targets
-            Y[:, j] = signal + rng.normal(0, 0.05, size=n_samples)
+@bp.route('/forecast-cache', methods=['GET'])
+def forecast_cache_stats():
+    """Return hit-rate and size of the in-process forecast result cache."""
+    return jsonify(get_forecast_cache().stats()), 200
 
-        model = RandomForestRegressor(random_state=42, n_estimators=120, max_depth=18, n_jobs=-1)
-        model.fit(X, Y)
+@bp.route('/shadow', methods=['GET'])
+def shadow_stats():
+    """Compare registered candidate models against the live ones (latency, top-6 overlap)."""
+    return jsonify(get_shadow_evaluator().stats()), 200
 
-        bundle = {'model': model, 'labels': JOBS_MASTER}
-        os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-        dump(bundle, MODEL_PATH)
+@bp.route('/shadow', methods=['POST'])
+@token_required
+def register_shadow_candidate(current_user):
+    """Register a candidate artifact (in the models directory) to run in shadow.
+    Body: {program: 'it'|'cs', path: 'dt_career_cs.candidate.joblib', sample_rate: 0.1}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        program = (data.get('program') or 'it').strip().lower()
+        path = (data.get('path') or '').strip()
+        if not path:
+            return jsonify({'message': 'path is required'}), 400
+        sample_rate = float(data.get('sample_rate', os.getenv('SHADOW_SAMPLE_RATE', '0.1')))
+        candidate, error = get_shadow_evaluator().register(program, path, sample_rate)
+        if candidate is None:
+            return jsonify({'message': 'Shadow registration failed', 'error': error}), 400
+        print(f"[OBJECTIVE-1] Shadow candidate for {program}: {candidate.path} @ {candidate.sample_rate} (by {current_user})")
+        return jsonify({'message': 'Shadow candidate registered', 'candidate': candidate.summary()}), 201
+    except Exception as e:
+        return jsonify({'message': 'Shadow registration failed', 'error': str(e)}), 500
 
-        return jsonify({'message': 'Model bootstrapped (RandomForest)', 'labels_count': n_labels, 'model_path': MODEL_PATH}), 200
+@bp.route('/shadow/<program>', methods=['DELETE'])
+@token_required
+def remove_shadow_candidate(current_user, program):
+    candidate = get_shadow_evaluator().unregister(program)
+    if candidate is None:
+        return jsonify({'message': 'No shadow candidate', 'program': program}), 404
+    return jsonify({'message': 'Shadow candidate removed', 'candidate': candidate.summary()}), 200
+
+@bp.route('/shadow/<program>/promote', methods=['POST'])
+@token_required
+def promote_shadow_candidate(current_user, program):
+    """Publish the shadow candidate as the live model for ``program`` and stop shadowing."""
+    try:
+        evaluator = get_shadow_evaluator()
+        candidate = evaluator.get(program)
+        if candidate is None:
+            return jsonify({'message': 'No shadow candidate', 'program': program}), 404
+        live_path = get_model_registry().path_for(program)
+        publish_career_model(program, candidate.bundle['model'], candidate.bundle['labels'], live_path)
+        evaluator.unregister(program)
+        print(f"[OBJECTIVE-1] Promoted shadow candidate {candidate.path} -> {live_path} (by {current_user})")
+        return jsonify({'message': 'Shadow candidate promoted', 'model_path': live_path, 'candidate': candidate.summary()}), 200
     except Exception as e:
-        return jsonify({'message': 'Bootstrap failed', 'error': str(e)}), 500
+        return jsonify({'message': 'Promotion failed', 'error': str(e)}), 500
 
 @bp.route('/latest', methods=['GET'])
 def get_latest_career_forecast():
@@ -113,14 +209,21 @@ def process_career_forecast():
         # Career forecasting logic based on academic performance
         (career_labels, career_probs), forecast_error = calculate_career_forecast(grades)
         
+        # Candidate model (if any) is scored on a background thread
+        if career_labels:
+            get_shadow_evaluator().maybe_submit('it', grades, career_labels)
+
         # Save to database
         if career_labels:
             try:
                 supabase = get_supabase_client()
                 
-                # Get user by email
-                user_response = supabase.table('users').select('id').eq('email', email).execute()
-                if user_response.data:
+                # Get user by email (with the stored result, to skip no-op writes)
+                user_response = supabase.table('users').select('id, career_top_jobs, career_top_jobs_scores').eq('email', email).execute()
+                if user_response.data and forecast_unchanged(user_response.data[0], career_labels, career_probs):
+                    get_forecast_cache().record_skipped_write()
+                    print(f"[OBJECTIVE-1] Stored career forecast unchanged for user {user_response.data[0]['id']}; skipping write")
+                elif user_response.data:
                     user_id = user_response.data[0]['id']
                     
                     # Save as array of top jobs (ordered)
@@ -131,6 +234,7 @@ def process_career_forecast():
                     }
                     
                     supabase.table('users').update(update_data).eq('id', user_id).execute()
+                    get_analytics_refresher().mark_dirty()
                     print(f"[OBJECTIVE-1] Saved career forecast to database for user {user_id}")
                 else:
                     print(f"[OBJECTIVE-1] User not found for email: {email}")
@@ -146,18 +250,30 @@ def process_career_forecast():
                 'grades_count': len(grades)
             }), status
 
-        return jsonify({
+        response = {
             'message': 'Career forecast processed (Objective 1)',
             'email': email,
             'grades_count': len(grades),
             'career_top_jobs': career_labels,
             'career_top_jobs_scores': career_probs
-        }), 200
+        }
+        if data.get('explain'):
+            response['career_explanations'], explain_error = explain_career_forecast(grades, career_labels, 'it')
+            if explain_error:
+                response['explain_error'] = explain_error
+        return jsonify(response), 200
         
     except Exception as e:
         print(f"[OBJECTIVE-1] Error: {e}")
         return jsonify({'message': 'Career forecast failed', 'error': str(e)}), 500
 
+@bp.route('/process-batch', methods=['POST'])
+def process_career_forecast_batch():
+    """Forecast careers for many students with a single model call."""
+    data = request.get_json(silent=True) or {}
+    payload, status = process_forecast_batch_request(data, program='it')
+    return jsonify(payload), status
+
 @bp.route('/save-results', methods=['POST'])
 def save_career_results():
     """Save career forecast results to database"""
@@ -206,6 +322,7 @@ def clear_career_results():
                 'career_top_jobs_scores': [],
             }
             supabase.table('users').update(update_data).eq('id', user_id).execute()
+            get_analytics_refresher().mark_dirty()
             return jsonify({'message': 'Career results cleared (Objective 1)'}), 200
         except Exception as db_error:
             print(f"[OBJECTIVE-1] Clear DB error: {db_error}")
@@ -215,44 +332,106 @@ def clear_career_results():
         return jsonify({'message': 'Failed to clear career results', 'error': str(e)}), 500
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'models', 'dt_career.joblib')
+get_career_engine().register('it', MODEL_PATH)
 
 def calculate_career_forecast(grades):
     """
     Career forecast via RandomForestRegressor over course-grade features.
     - Input: fixed numeric grades aligned with ITStaticTable order.
-    - Output: dict of career -> probability (0..1), top 6 only.
-    No fallbacks: returns {} if model cannot run or input invalid.
+    - Output: ((top labels, scores 0..1), error), top 6 only.
+    No fallbacks: returns ([], []) with an error if the model cannot run or input is invalid.
+    """
+    return get_career_engine().forecast('it', grades)
+
+def explain_career_forecast(grades, top_labels, program: str = 'it', top_features: int = 5):
+    """
+    Per-course attributions for each of ``top_labels`` from the compiled forest's
+    precomputed node-delta tables (one path walk; no per-request explainer).
+    - Output: ({job: {'base', 'courses': [{'index', 'contribution'}, ...]}}, error).
+    Contributions are in the same min-max units as career_top_jobs_scores and
+    ``index`` is the position of the grade in the request.
     """
     try:
-        if not grades or not isinstance(grades, list):
-            return [], 'Invalid or empty grades input'
-        X = np.array([[float(g) for g in grades]])
-        if X.size == 0:
-            return [], 'Empty feature vector'
-
-        # Load pre-trained model
-        if not os.path.exists(MODEL_PATH):
-            return [], f'Model file not found at {MODEL_PATH}'
-        model_bundle = load(MODEL_PATH)
-        model: RandomForestRegressor = model_bundle.get('model')
-        labels: list[str] = model_bundle.get('labels')
-        if model is None or not labels:
-            return [], 'Model bundle missing required keys {model, labels}'
-        # Predict per-career score (regression per label stacked)
-        y_pred = model.predict(X)
-        if y_pred.ndim == 1:
-            # single target not supported for multi-career; treat as invalid
-            return [], 'Model output shape invalid (expected multi-target)'
-        scores = y_pred[0]
-        # Normalize to 0..1 via min-max if needed
-        s_min, s_max = float(np.min(scores)), float(np.max(scores))
-        if s_max == s_min:
-            return [], 'Model produced constant scores'
-        probs = (scores - s_min) / (s_max - s_min)
-        pairs = sorted(zip(labels, probs.tolist()), key=lambda x: x[1], reverse=True)
-        top_pairs = pairs[:6]
-        top_labels = [k for k, _ in top_pairs]
-        top_probs = [round(float(v), 4) for _, v in top_pairs]
-        return (top_labels, top_probs), None
+        bundle, load_error = get_model_registry().get_compiled(program)
+        if bundle is None:
+            return None, load_error
+        forest = bundle['model']
+        X = np.array([[float(g) for g in grades]], dtype=np.float32)
+        if X.shape[1] != forest.n_features_in_:
+            return None, f'Expected {forest.n_features_in_} grades, got {X.shape[1]}'
+        index = {name: i for i, name in enumerate(forest.labels)}
+        outputs = [index[name] for name in top_labels if name in index]
+        scores = forest.predict(X)[0]
+        span = float(np.max(scores) - np.min(scores)) or 1.0
+        bias, contrib = forest.contributions(X, outputs)
+        contrib = contrib[0] / span
+        explanations = {}
+        for j, name in enumerate(name for name in top_labels if name in index):
+            column = contrib[:, j]
+            order = np.argsort(-np.abs(column), kind='stable')[:top_features]
+            explanations[name] = {
+                'base': round(float((bias[j] - np.min(scores)) / span), 4),
+                'courses': [{'index': int(i), 'contribution': round(float(column[i]), 4)} for i in order if column[i] != 0],
+            }
+        return explanations, None
     except Exception as e:
-        return [], f'Model inference error: {e}'
+        return None, f'Explanation error: {e}'
+
+def calculate_career_forecast_batch(grade_rows, program: str = 'it'):
+    """
+    Vectorized counterpart of calculate_career_forecast for N students.
+    - Output: (results, error) where results[i] is {'career_top_jobs', 'career_top_jobs_scores'}
+      or {'error': ...} for rows that could not be scored.
+    """
+    return get_career_engine().forecast_batch(program, grade_rows)
+
+def process_forecast_batch_request(data, program: str = 'it', chunk_size: int = 500):
+    """
+    Shared body of the /process-batch endpoints.
+
+    Accepts either {"items": [{"email": .., "grades": [..]}, ...]} or
+    {"emails": [..]} (grades are then read from users.grades). Results are scored
+    in one batch and written back with chunked bulk updates.
+    Returns (payload, status).
+    """
+    persist = data.get('persist', True) is not False
+    try:
+        entries, users_by_email = load_batch_entries(data, chunk_size)
+    except Exception as db_error:
+        return {'message': 'Failed to load grades', 'error': str(db_error)}, 500
+    if entries is None:
+        return {'message': 'items or emails array required'}, 400
+
+    results, batch_error = calculate_career_forecast_batch([e['grades'] for e in entries], program=program)
+    if batch_error:
+        return {'message': batch_error, 'count': len(entries)}, 422
+
+    def _columns(entry, result, analyzed_at):
+        if not result or 'error' in result:
+            return None
+        return {
+            'career_forecast_analyzed_at': analyzed_at,
+            'career_top_jobs': result['career_top_jobs'],
+            'career_top_jobs_scores': result['career_top_jobs_scores'],
+        }
+
+    write_stats = {'written': 0, 'fallback_rows': 0, 'failed': 0}
+    if persist:
+        try:
+            write_stats = persist_batch_results(entries, results, users_by_email, _columns, chunk_size)
+        except Exception as db_error:
+            print(f"[OBJECTIVE-1] Batch save error: {db_error}")
+
+    out = []
+    for entry, result in zip(entries, results):
+        out.append({'email': entry['email'], 'grades_count': len(entry['grades']), **(result or {})})
+    scored = sum(1 for r in results if r and 'error' not in r)
+    print(f"[OBJECTIVE-1] Batch forecast ({program}): {scored}/{len(entries)} scored, {write_stats['written']} saved")
+    return {
+        'message': 'Career forecast batch processed',
+        'program': program,
+        'count': len(entries),
+        'scored': scored,
+        'saved': write_stats['written'],
+        'results': out,
+    }, 200
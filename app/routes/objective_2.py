@@ -11,6 +11,9 @@ from datetime import datetime, timezone
 import math
 from typing import Dict, List
 import numpy as np
+from app.services.riasec import LLOYD_ITERATIONS, get_curriculum_registry, score_riasec, score_riasec_batch
+from app.services.batch_users import load_batch_entries, persist_batch_results
+from app.services.analytics import get_analytics_refresher
 
 bp = Blueprint('objective_2', __name__, url_prefix='/api/objective-2')
 
@@ -112,6 +115,7 @@ def process_archetype_analysis():
                         pass
                     
                     supabase.table('users').update(update_data).eq('id', user_id).execute()
+                    get_analytics_refresher().mark_dirty()
                     print(f"[OBJECTIVE-2] Saved archetype analysis to database for user {user_id}")
                 else:
                     print(f"[OBJECTIVE-2] User not found for email: {email}")
@@ -129,6 +133,84 @@ def process_archetype_analysis():
         print(f"[OBJECTIVE-2] Error: {e}")
         return jsonify({'message': 'Archetype analysis failed', 'error': str(e)}), 500
 
+@bp.route('/curriculum', methods=['GET'])
+def curriculum_stats():
+    """Return the loaded curriculum version, course counts and order-cache counters."""
+    try:
+        return jsonify(get_curriculum_registry().stats()), 200
+    except Exception as e:
+        return jsonify({'message': 'Curriculum unavailable', 'error': str(e)}), 500
+
+@bp.route('/process-batch', methods=['POST'])
+def process_archetype_batch():
+    """
+    RIASEC archetypes for a whole cohort in one pass.
+
+    Accepts {"items": [{"email": .., "grades": [..], "order_ids": [..]?}, ...]} or
+    {"emails": [..]} (grades are then read from users.grades), plus optional
+    top-level "order_ids", "iterations", "early_stop" and "persist". Students
+    sharing a course order are clustered together on one tensor and the
+    archetype_* columns are written with chunked bulk updates.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        persist = data.get('persist', True) is not False
+        default_order = data.get('order_ids') or None
+        iterations = max(1, min(50, int(data.get('iterations') or LLOYD_ITERATIONS)))
+        early_stop = data.get('early_stop', True) is not False
+        chunk_size = 500
+
+        entries, users_by_email = load_batch_entries(data, chunk_size)
+        if entries is None:
+            return jsonify({'message': 'items or emails array required'}), 400
+        for entry in entries:
+            entry['order_ids'] = entry['item'].get('order_ids') or default_order
+
+        # One tensor per distinct course order
+        groups: Dict[tuple, List[int]] = {}
+        for i, entry in enumerate(entries):
+            order = entry['order_ids']
+            key = tuple(order) if isinstance(order, list) and all(isinstance(x, str) for x in order) else ()
+            groups.setdefault(key, []).append(i)
+        results: List[Dict] = [{} for _ in entries]
+        for key, members in groups.items():
+            scored = score_riasec_batch([entries[i]['grades'] for i in members], list(key) or None,
+                                        iterations=iterations, early_stop=early_stop)
+            for i, result in zip(members, scored):
+                results[i] = result
+
+        def _columns(entry, result, analyzed_at):
+            if not result:
+                return None
+            return {
+                'archetype_analyzed_at': analyzed_at,
+                'primary_archetype': result['primary_archetype'],
+                **{f'archetype_{name}_percentage': value for name, value in result['archetype_percentages'].items()},
+            }
+
+        write_stats = {'written': 0, 'fallback_rows': 0, 'failed': 0}
+        if persist:
+            try:
+                write_stats = persist_batch_results(entries, results, users_by_email, _columns, chunk_size)
+            except Exception as db_error:
+                print(f"[OBJECTIVE-2] Batch save error: {db_error}")
+
+        scored_count = sum(1 for r in results if r)
+        print(f"[OBJECTIVE-2] Batch archetypes: {scored_count}/{len(entries)} scored, {write_stats['written']} saved")
+        return jsonify({
+            'message': 'Archetype batch processed (Objective 2)',
+            'count': len(entries),
+            'scored': scored_count,
+            'saved': write_stats['written'],
+            'results': [
+                {'email': entry['email'], 'grades_count': len(entry['grades']), 'archetype_analysis': result}
+                for entry, result in zip(entries, results)
+            ],
+        }), 200
+    except Exception as e:
+        print(f"[OBJECTIVE-2] Batch error: {e}")
+        return jsonify({'message': 'Archetype batch failed', 'error': str(e)}), 500
+
 @bp.route('/save-results', methods=['POST'])
 def save_archetype_results():
     """Save archetype analysis results to database"""
@@ -182,6 +264,7 @@ def clear_archetype_results():
                 'archetype_conventional_percentage': None,
             }
             supabase.table('users').update(update_data).eq('id', user_id).execute()
+            get_analytics_refresher().mark_dirty()
             return jsonify({'message': 'Archetype results cleared (Objective 2)'}), 200
         except Exception as db_error:
             print(f"[OBJECTIVE-2] Clear DB error: {db_error}")
@@ -192,264 +275,11 @@ def clear_archetype_results():
 
 def calculate_riasec_archetype(grades, order_ids: List[str] | None = None):
     """
-    RIASEC via KMeans-style clustering using BSIT course-to-RIASEC mapping.
-    - Input: fixed-order numeric grades array aligned with ITStaticTable.
-    - Approach: map each course to a 6D RIASEC vector, weight by grade quality,
-      cluster points with k=6 (centroids init to unit R/I/A/S/E/C), compute
-      percentages from clustered weights, and pick primary archetype.
+    RIASEC via KMeans-style clustering using the BSIT/BSCS course-to-RIASEC mapping.
+    - Input: fixed-order numeric grades array aligned with ITStaticTable (or ``order_ids``).
+    - Approach: project courses through the precompiled (courses x 6) matrix,
+      weight by grade quality, cluster with k=6 (centroids init to unit
+      R/I/A/S/E/C), compute percentages from clustered weights, and pick the
+      primary archetype. See app/services/riasec.py.
     """
-    if not grades:
-        return {}
-
-    # Normalize grades to weights: higher grade -> higher weight.
-    # Treat 0 (no input) as 0 weight. Grades scale is 1.00(best)..3.00(pass)..4.00(fail)
-    def grade_to_weight(g: float) -> float:
-        if g is None:
-            return 0.0
-        try:
-            x = float(g)
-        except Exception:
-            return 0.0
-        if x <= 0:
-            return 0.0
-        if x < 1 or x > 4:
-            return 0.0
-        # Invert so lower numeric grade (better) gives higher weight
-        return max(0.0, 4.0 - x)
-
-    # RIASEC axes order
-    axes = ['R', 'I', 'A', 'S', 'E', 'C']
-    axis_index: Dict[str, int] = {a: i for i, a in enumerate(axes)}
-
-    # Canonical IT IDs order subset (only those we explicitly map). Indices must
-    # align with the frontend order; any indices without mapping are ignored.
-    # Year 1
-    id_to_axes: Dict[str, List[str]] = {
-        'it_fy1_sts0002': ['S','I'],
-        'it_fy1_aap0007': ['A'],
-        'it_fy1_pcm0006': ['S','E'],
-        'it_fy1_mmw0001': ['I'],
-        'it_fy1_ipp0010': ['S','C'],
-        'it_fy1_icc0101': ['I','C'],
-        'it_fy1_icc0102': ['I','C'],
-        'it_fy1_ped0001': ['R','S'],
-        'it_fy1_nstp01': ['S','E'],
-        # Year 1 - 2nd sem
-        'it_fy2_cet0111': ['I'],
-        'it_fy2_cet0114': ['I','R'],
-        'it_fy2_eit0121': ['A','S'],
-        'it_fy2_eit0122': ['I'],
-        'it_fy2_eit0123': ['A','C'],
-        'it_fy2_icc0103': ['I','C'],
-        'it_fy2_gtb121': ['S','A'],
-        'it_fy2_ped0013': ['R','S'],
-        'it_fy2_nstp02': ['S','E'],
-        # Year 2 - 1st sem
-        'it_sy1_cet0121': ['I'],
-        'it_sy1_cet0225': ['I','R'],
-        'it_sy1_tcw0005': ['S','E'],
-        'it_sy1_icc0104': ['I','C'],
-        'it_sy1_eit0211': ['I','C'],
-        'it_sy1_ppc122': ['S','A'],
-        'it_sy1_ped0054': ['R','S'],
-        # Year 2 - 2nd sem
-        'it_sy2_eit0221': ['I'],
-        'it_sy2_eit0222': ['R','I'],
-        'it_sy2_eit0222_1': ['R','I'],
-        'it_sy2_ges0013': ['I','S'],
-        'it_sy2_rph0004': ['S','C'],
-        'it_sy2_uts0003': ['S','E'],
-        'it_sy2_ped0074': ['R','S'],
-        # Year 3 - 1st sem
-        'it_ty1_icc0335': ['I','E'],
-        'it_ty1_eit0311': ['C','I'],
-        'it_ty1_eit0311_1': ['C','I'],
-        'it_ty1_eit0312': ['R','I'],
-        'it_ty1_eit0312_1': ['R','I'],
-        'it_ty1_eit_elective3': [],
-        'it_ty1_lwr0009': ['S','E'],
-        # Year 3 - 2nd sem
-        'it_ty2_eit0321': ['R','C'],
-        'it_ty2_eit0321_1': ['R','C'],
-        'it_ty2_eit0322': ['R','C'],
-        'it_ty2_eit0322_1': ['R','C'],
-        'it_ty2_eit0323': ['I','C'],
-        'it_ty2_eit0323_1': ['I','C'],
-        'it_ty2_eth0008': ['S','C'],
-        # Midyear
-        'it_my_eit0331': ['R','C'],
-        'it_my_eit0331_1': ['R','C'],
-        'it_my_cap0101': ['E','I','S'],
-        # Year 4
-        'it_fy4_cap0102': ['E','I','S'],
-        'it_fy4_elective4': [],
-        'it_fy4_elective5': [],
-        'it_fy4_elective6': [],
-        'it_fy4b_iip0101a': ['R','E'],
-        'it_fy4b_iip0101_1': ['R','S','E'],
-    }
-
-    # Build the canonical order used by the frontend for the mapped subset.
-    # Only these mapped IDs affect RIASEC scoring; others are ignored.
-    curriculum_order: List[str] = list(id_to_axes.keys())
-
-    # BSCS mapping (subset) aligned with frontend CStaticTable ids
-    # Uses the provided RIASEC rationale; we map to axes lists
-    id_to_axes_cs: Dict[str, List[str]] = {
-        # Year 1 - 1st sem
-        'cs_fy1_intro_comp': ['I','R'],
-        'cs_fy1_fund_prog': ['I','R'],
-        'cs_fy1_disc_struct1': ['I'],
-        'cs_fy1_sts': ['I','S'],
-        'cs_fy1_mmw': ['I'],
-        'cs_fy1_pcm': ['S','E'],
-        'cs_fy1_fil': ['S','C'],
-        'cs_fy1_pe1': ['S','R'],
-        'cs_fy1_nstp1': ['S','E'],
-        # Year 1 - 2nd sem
-        'cs_fy2_intermediate_prog': ['I','R'],
-        'cs_fy2_dsa': ['I','C'],
-        'cs_fy2_discrete2': ['I'],
-        'cs_fy2_hci': ['S','I'],
-        'cs_fy2_tcw': ['S'],
-        'cs_fy2_rph': ['S','C'],
-        'cs_fy2_lwr': ['S','E'],
-        'cs_fy2_group_ex': ['S','R'],
-        'cs_fy2_nstp2': ['S','E'],
-        # Year 2 - 1st sem
-        'cs_sy1_oop': ['I','R'],
-        'cs_sy1_logic_design': ['R','I'],
-        'cs_sy1_or': ['I','C'],
-        'cs_sy1_im': ['C','I'],
-        'cs_sy1_living_it_era': ['S','I'],
-        'cs_sy1_ethics': ['S','C'],
-        'cs_sy1_uts': ['S'],
-        'cs_sy1_pe_elective': ['S','R'],
-        # Year 2 - 2nd sem
-        'cs_sy2_algo_complexity': ['I'],
-        'cs_sy2_arch_org': ['R','I'],
-        'cs_sy2_app_dev_emerging': ['I','C'],
-        'cs_sy2_ias': ['I','C'],
-        'cs_sy2_entre_mind': ['E','S'],
-        'cs_sy2_env_sci': ['I','S'],
-        'cs_sy2_art_app': ['A'],
-        'cs_sy2_pe_elective': ['S','R'],
-        # Year 3 - 1st sem
-        'cs_ty1_automata': ['I'],
-        'cs_ty1_prog_lang': ['I','R'],
-        'cs_ty1_se1': ['I','C','E'],
-        'cs_ty1_os': ['I','R'],
-        'cs_ty1_intelligent_sys': ['I','A'],
-        # Year 3 - 2nd sem
-        'cs_ty2_se2': ['I','E','C'],
-        'cs_ty2_compiler': ['I'],
-        'cs_ty2_comp_sci': ['I','C'],
-        'cs_ty2_elective1': [],
-        'cs_ty2_research_writing': ['I','C'],
-        # Year 3 - Summer
-        'cs_ty_summer_practicum': ['R','E'],
-        # Year 4 - 1st sem
-        'cs_fy4_thesis1': ['I','E'],
-        'cs_fy4_networks': ['R','I'],
-        'cs_fy4_elective2': [],
-        'cs_fy4_elective3': [],
-        # Year 4 - 2nd sem
-        'cs_fy4b_thesis2': ['I','E'],
-        'cs_fy4b_parallel_dist': ['I','R'],
-        'cs_fy4b_social_prof': ['S','C'],
-        'cs_fy4b_graphics_visual': ['A','I'],
-    }
-
-    # If explicit order_ids provided from frontend, use that; else append CS ids after IT subset
-    if order_ids and isinstance(order_ids, list) and all(isinstance(x, str) for x in order_ids):
-        curriculum_order = list(order_ids)
-    else:
-        curriculum_order += list(id_to_axes_cs.keys())
-
-    # Create course vectors (points) in RIASEC space
-    points: List[np.ndarray] = []
-    weights: List[float] = []
-    for idx, course_id in enumerate(curriculum_order):
-        if idx >= len(grades):
-            break
-        g = grades[idx]
-        w = grade_to_weight(g)
-        if w <= 0:
-            continue
-        # Prefer IT map, then CS map
-        tags = id_to_axes.get(course_id, id_to_axes_cs.get(course_id, []))
-        if not tags:
-            continue
-        vec = np.zeros(6, dtype=float)
-        share = w / len(tags)
-        for t in tags:
-            if t in axis_index:
-                vec[axis_index[t]] = share
-        points.append(vec)
-        weights.append(w)
-
-    if not points:
-        return {}
-
-    X = np.vstack(points)
-
-    # Initialize centroids as unit vectors for R,I,A,S,E, and C respectively
-    centroids = np.eye(6, dtype=float)
-
-    # Run a few KMeans iterations (Lloyd's algorithm)
-    for _ in range(5):
-        # Assign step
-        distances = np.linalg.norm(X[:, None, :] - centroids[None, :, :], axis=2)
-        labels = np.argmin(distances, axis=1)
-        # Update step
-        for k in range(6):
-            mask = labels == k
-            if np.any(mask):
-                centroids[k] = X[mask].mean(axis=0)
-
-    # Aggregate total weight per cluster (axis)
-    totals = np.zeros(6, dtype=float)
-    for vec in X:
-        # Assign to nearest final centroid
-        d = np.linalg.norm(vec[None, :] - centroids, axis=1)
-        k = int(np.argmin(d))
-        totals[k] += vec.sum()
-
-    total_sum = float(totals.sum())
-    if total_sum <= 0:
-        return {}
-
-    percentages = (totals / total_sum) * 100.0
-    scores = totals.tolist()
-
-    # Determine primary archetype by highest percentage
-    max_idx = int(np.argmax(percentages))
-    axis_to_name = {
-        'R': 'realistic',
-        'I': 'investigative',
-        'A': 'artistic',
-        'S': 'social',
-        'E': 'enterprising',
-        'C': 'conventional',
-    }
-    primary = axis_to_name.get(axes[max_idx], axes[max_idx].lower())
-
-    return {
-        'primary_archetype': primary,
-        'archetype_percentages': {
-            'realistic': round(float(percentages[axis_index['R']]), 2),
-            'investigative': round(float(percentages[axis_index['I']]), 2),
-            'artistic': round(float(percentages[axis_index['A']]), 2),
-            'social': round(float(percentages[axis_index['S']]), 2),
-            'enterprising': round(float(percentages[axis_index['E']]), 2),
-            'conventional': round(float(percentages[axis_index['C']]), 2)
-        },
-        'archetype_scores': {
-            'realistic': round(float(scores[axis_index['R']]), 3),
-            'investigative': round(float(scores[axis_index['I']]), 3),
-            'artistic': round(float(scores[axis_index['A']]), 3),
-            'social': round(float(scores[axis_index['S']]), 3),
-            'enterprising': round(float(scores[axis_index['E']]), 3),
-            'conventional': round(float(scores[axis_index['C']]), 3)
-        }
-    }
+    return score_riasec(grades, order_ids)
@@ -1,50 +1,29 @@
 from flask import Blueprint, request, jsonify
-import io
 import re
-from typing import List, Dict, Any
-import pdfplumber
-import easyocr
-from PIL import Image
-import pypdfium2 as pdfium
-import numpy as np
-import os
+from typing import Dict, Any
 from app.services.supabase_client import get_supabase_client
+from app.services.ocr_pool import OcrPoolBusy, get_ocr_pool
+from app.services.tor_pages import extract_pages
 
 # Expose under /api/ocr-tor/*
 bp = Blueprint('ocr_tor', __name__, url_prefix='/api/ocr-tor')
 
 def extract_grades_from_tor(file_bytes: bytes, filename: str) -> Dict[str, Any]:
-    """Extract text and clean grade list from a TOR PDF using EasyOCR."""
+    """Extract text and clean grade list from a TOR PDF, reading each page's text layer
+    and falling back to EasyOCR for image-only or low-text pages."""
     full_text = ""
+    pages = []
 
     try:
-        print(f"[OCR_TOR] Starting EasyOCR extraction for {filename}")
-        reader = easyocr.Reader(['en'])
-        pdf = pdfium.PdfDocument(io.BytesIO(file_bytes))
-        print(f"[OCR_TOR] PDF has {len(pdf)} pages")
-
-        for i in range(len(pdf)):
-            page = pdf[i]
-            print(f"[OCR_TOR] Processing page {i+1}...")
-
-            bmp = page.render(scale=2)
-            try:
-                pil_image = bmp.to_pil()
-            finally:
-                del bmp
-
-            pil_image = pil_image.convert('RGB')
-            image_array = np.array(pil_image)
-
-            results = reader.readtext(image_array)
-            page_text = " ".join(
-                text for (_, text, conf) in results if conf > 0.5
-            )
-            full_text += " " + page_text
-            print(f"[OCR_TOR] Page {i+1} extracted {len(page_text)} characters")
+        print(f"[OCR_TOR] Starting extraction for {filename}")
+        for page in extract_pages(file_bytes):
+            full_text += " " + page.pop('text')
+            pages.append(page)
 
+    except OcrPoolBusy:
+        raise
     except Exception as ocr_error:
-        print(f"[OCR_TOR] EasyOCR failed: {ocr_error}")
+        print(f"[OCR_TOR] Extraction failed: {ocr_error}")
         full_text = f"OCR Error: {str(ocr_error)}"
 
     # ----------------------------
@@ -69,7 +48,8 @@ def extract_grades_from_tor(file_bytes: bytes, filename: str) -> Dict[str, Any]:
     return {
         'grade_values': grade_values,
         'grades': grades,
-        'full_text': full_text
+        'full_text': full_text,
+        'pages': pages
     }
 
 @bp.route('/process', methods=['POST', 'OPTIONS'])
@@ -103,13 +83,22 @@ def process_tor_extract_grades():
         return jsonify({
             'success': True,
             'grade_values': result['grade_values'],
-            'full_text': result['full_text']
+            'full_text': result['full_text'],
+            'pages': result['pages']
         }), 200
         
+    except OcrPoolBusy as busy:
+        print(f"[OCR_TOR] {busy}")
+        return jsonify({'error': 'OCR is busy, please retry shortly', 'detail': str(busy)}), 503
     except Exception as error:
         print(f"[OCR_TOR] Error: {error}")
         return jsonify({'error': str(error)}), 500
 
+@bp.route('/ocr-pool', methods=['GET'])
+def ocr_pool_stats():
+    """Readers loaded, leases, load time, queue wait and utilization of the OCR reader pool"""
+    return jsonify(get_ocr_pool().stats()), 200
+
 @bp.route('/get', methods=['GET'])
 @bp.route('/get/<int:user_id>', methods=['GET'])
 def get_grades(user_id=None):
@@ -0,0 +1,172 @@
+"""
+Cohort archetype/career analytics backed by materialized views.
+
+``analytics_archetype_by_cohort`` and ``analytics_top_jobs_by_cohort`` (see
+migrations/2026-10-16-create-cohort-analytics-views.sql) hold one row per
+(course, cohort) and per (course, cohort, job). Objective 1/2 writes call
+``mark_dirty()``; a background thread then refreshes the views at most once per
+ANALYTICS_REFRESH_MIN_SECONDS, and at least every ANALYTICS_REFRESH_MAX_SECONDS
+so writes from other processes are picked up too. A failed refresh (views not
+migrated yet, database down) is retried with exponential backoff up to
+ANALYTICS_REFRESH_MAX_SECONDS.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.supabase_client import get_supabase_client
+
+ARCHETYPES = ('realistic', 'investigative', 'artistic', 'social', 'enterprising', 'conventional')
+# PostgREST caps responses at 1000 rows by default
+FETCH_PAGE_SIZE = 1000
+
+
+class AnalyticsRefresher:
+    def __init__(self, min_interval: float = 60.0, max_interval: float = 900.0):
+        self.min_interval = max(1.0, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self._dirty = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.last_refresh: Optional[float] = None
+        self.last_attempt: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.marks = 0
+
+    def mark_dirty(self) -> None:
+        """Note that result columns changed; cheap enough for the request path."""
+        self.marks += 1
+        self._dirty.set()
+        self._wake.set()
+        self._ensure_thread()
+
+    def refresh_now(self) -> Dict[str, Any]:
+        """Refresh synchronously (admin endpoint / tests)."""
+        with self._lock:
+            was_dirty = self._dirty.is_set()
+            self._dirty.clear()
+            started = time.perf_counter()
+            self.last_attempt = time.time()
+            try:
+                get_supabase_client().rpc('refresh_cohort_analytics').execute()
+                self.last_refresh = self.last_attempt
+                self.last_error = None
+                self.refreshes += 1
+                self.failures = 0
+            except Exception as e:
+                self.last_error = str(e)
+                self.failures += 1
+                if was_dirty:
+                    self._dirty.set()
+                print(f"[ANALYTICS] Refresh failed ({self.failures} in a row, retry in {self._retry_interval():.0f}s): {e}")
+            return {**self.stats(), 'seconds': round(time.perf_counter() - started, 3)}
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='gradalyze-analytics', daemon=True)
+                self._thread.start()
+
+    def _retry_interval(self) -> float:
+        """Debounce window, doubled after each consecutive failure up to max_interval."""
+        if not self.failures:
+            return self.min_interval
+        return min(self.max_interval, self.min_interval * 2 ** (self.failures - 1))
+
+    def _run(self) -> None:
+        while True:
+            since = time.time() - (self.last_attempt or 0.0)
+            interval = self._retry_interval()
+            if (self._dirty.is_set() and since >= interval) or since >= self.max_interval:
+                self.refresh_now()
+                since = 0.0
+                interval = self._retry_interval()
+            # Sleep until the debounce/backoff window closes or the periodic refresh is due
+            wait = interval - since if self._dirty.is_set() else self.max_interval - since
+            self._wake.wait(timeout=max(1.0, wait))
+            self._wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'dirty': self._dirty.is_set(),
+            'last_refresh': self.last_refresh,
+            'last_attempt': self.last_attempt,
+            'last_error': self.last_error,
+            'refreshes': self.refreshes,
+            'consecutive_failures': self.failures,
+            'marks': self.marks,
+            'min_interval_seconds': self.min_interval,
+            'max_interval_seconds': self.max_interval,
+        }
+
+
+_refresher: Optional[AnalyticsRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_analytics_refresher() -> AnalyticsRefresher:
+    """Return the process-wide analytics refresher (created on first use)."""
+    global _refresher
+    if _refresher is None:
+        with _refresher_lock:
+            if _refresher is None:
+                _refresher = AnalyticsRefresher(
+                    min_interval=float(os.getenv('ANALYTICS_REFRESH_MIN_SECONDS', '60')),
+                    max_interval=float(os.getenv('ANALYTICS_REFRESH_MAX_SECONDS', '900')),
+                )
+    return _refresher
+
+
+def cohort_analytics(course: Optional[str] = None, cohort: Optional[str] = None, top_jobs: int = 10) -> List[Dict[str, Any]]:
+    """One entry per (course, cohort): archetype distribution, average percentages, top jobs."""
+    supabase = get_supabase_client()
+
+    def _all_rows(table: str, columns: str, order) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            q = supabase.table(table).select(columns)
+            if course:
+                q = q.eq('course', course)
+            if cohort:
+                q = q.eq('cohort', cohort)
+            for column, desc in order:
+                q = q.order(column, desc=desc)
+            page = q.range(start, start + FETCH_PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < FETCH_PAGE_SIZE:
+                return rows
+            start += FETCH_PAGE_SIZE
+
+    groups = _all_rows('analytics_archetype_by_cohort', '*', [('course', False), ('cohort', False)])
+    # Full, unique ordering so range pages neither skip nor repeat rows
+    jobs = _all_rows('analytics_top_jobs_by_cohort', 'course, cohort, job, students, top1_students, avg_score',
+                     [('course', False), ('cohort', False), ('students', True), ('job', False)])
+
+    jobs_by_group: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in jobs:
+        bucket = jobs_by_group.setdefault((row['course'], row['cohort']), [])
+        if len(bucket) < top_jobs:
+            bucket.append({k: row[k] for k in ('job', 'students', 'top1_students', 'avg_score')})
+
+    out = []
+    for row in groups:
+        out.append({
+            'course': row['course'],
+            'cohort': row['cohort'],
+            'students': row['students'],
+            'analyzed': row['analyzed'],
+            'forecasted': row['forecasted'],
+            'primary_archetype_counts': {name: row[f'{name}_count'] for name in ARCHETYPES},
+            'avg_archetype_percentages': {name: row[f'avg_{name}_percentage'] for name in ARCHETYPES},
+            'top_jobs': jobs_by_group.get((row['course'], row['cohort']), []),
+            'refreshed_at': row.get('refreshed_at'),
+        })
+    return out
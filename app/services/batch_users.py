@@ -0,0 +1,93 @@
+"""
+Shared plumbing of the cohort ``/process-batch`` endpoints (objective 1 and 2).
+
+Both accept either {"items": [{"email": .., "grades": [..]}, ...]} or
+{"emails": [..]} (grades then come from ``users.grades``), score everything in
+one batch and write the per-user result columns back with ``bulk_update_users``.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.analytics import get_analytics_refresher
+from app.services.bulk_writes import bulk_update_users
+from app.services.supabase_client import get_supabase_client
+
+
+def coerce_grades(values) -> List[float]:
+    """Keep numeric grades within 0..4; accepts numbers, numeric strings or {grade: ..} objects."""
+    grades = []
+    for value in values or []:
+        if isinstance(value, dict):
+            value = value.get('grade')
+        try:
+            x = float(value)
+        except Exception:
+            continue
+        if 0 <= x <= 4:
+            grades.append(x)
+    return grades
+
+
+def stored_grades(row: Dict[str, Any]) -> List[float]:
+    """Coerced ``users.grades`` of a row (the column may hold a JSON string)."""
+    value = (row or {}).get('grades') or []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:
+            value = []
+    return coerce_grades(value)
+
+
+def _users_by_email(supabase, emails: List[str], columns: str, chunk_size: int, into: Dict[str, Dict[str, Any]]) -> None:
+    for start in range(0, len(emails), chunk_size):
+        resp = supabase.table('users').select(columns).in_('email', emails[start:start + chunk_size]).execute()
+        for row in resp.data or []:
+            into[(row.get('email') or '').lower()] = row
+
+
+def load_batch_entries(data: Dict[str, Any], chunk_size: int = 500) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+    """(entries, users_by_email) for a batch request body; entries is None when neither
+    ``items`` nor ``emails`` is given. Each entry is {'email', 'grades', 'item'}, where
+    ``item`` is the request item ({} for emails). Database errors propagate."""
+    items = data.get('items')
+    emails = data.get('emails')
+    users_by_email: Dict[str, Dict[str, Any]] = {}
+    if isinstance(items, list) and items:
+        entries = []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            entries.append({
+                'email': (item.get('email') or '').strip().lower(),
+                'grades': coerce_grades(item.get('grades')),
+                'item': item,
+            })
+        return entries, users_by_email
+    if isinstance(emails, list) and emails:
+        normalized = [e.strip().lower() for e in emails if isinstance(e, str)]
+        _users_by_email(get_supabase_client(), normalized, 'id, email, grades', chunk_size, users_by_email)
+        entries = [{'email': email, 'grades': stored_grades(users_by_email.get(email)), 'item': {}} for email in normalized]
+        return entries, users_by_email
+    return None, users_by_email
+
+
+def persist_batch_results(entries: List[Dict[str, Any]], results: List[Any], users_by_email: Dict[str, Dict[str, Any]],
+                          columns_for: Callable[[Dict[str, Any], Any, str], Optional[Dict[str, Any]]],
+                          chunk_size: int = 500) -> Dict[str, int]:
+    """Bulk-write ``columns_for(entry, result, analyzed_at)`` (None = skip) for every entry
+    whose email belongs to a user, then mark the analytics views dirty."""
+    supabase = get_supabase_client()
+    missing = [e['email'] for e in entries if e['email'] and e['email'] not in users_by_email]
+    _users_by_email(supabase, missing, 'id, email', chunk_size, users_by_email)
+    analyzed_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for entry, result in zip(entries, results):
+        user = users_by_email.get(entry['email'])
+        columns = columns_for(entry, result, analyzed_at) if user else None
+        if columns:
+            rows.append({'id': user['id'], 'email': entry['email'], **columns})
+    write_stats = bulk_update_users(supabase, rows, chunk_size=chunk_size)
+    get_analytics_refresher().mark_dirty()
+    return write_stats
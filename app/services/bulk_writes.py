@@ -0,0 +1,72 @@
+"""
+Bulk write helpers for denormalized result columns on the users table.
+
+Chunks go through the ``bulk_update_users`` RPC (see
+migrations/2026-10-16-create-bulk-update-users-rpc.sql), one UPDATE ... FROM
+statement per chunk. Until that migration is applied, chunks fall back to
+per-row updates.
+"""
+
+from typing import Any, Dict, List
+
+# Columns the bulk_update_users RPC knows how to set
+BULK_UPDATE_COLUMNS = frozenset({
+    'career_forecast_analyzed_at', 'career_top_jobs', 'career_top_jobs_scores', 'job_recommendations',
+    'archetype_analyzed_at', 'primary_archetype',
+    'archetype_realistic_percentage', 'archetype_investigative_percentage', 'archetype_artistic_percentage',
+    'archetype_social_percentage', 'archetype_enterprising_percentage', 'archetype_conventional_percentage',
+})
+
+
+def _updated_count(data: Any, default: int) -> int:
+    """The RPC's integer result, however the client wraps it."""
+    if isinstance(data, list) and data:
+        data = data[0]
+    if isinstance(data, dict):
+        data = next(iter(data.values()), None)
+    try:
+        return int(data)
+    except Exception:
+        return default
+
+
+def bulk_update_users(supabase, rows: List[Dict[str, Any]], chunk_size: int = 500) -> Dict[str, int]:
+    """Write many per-user column updates with as few round trips as possible.
+
+    Each row must carry the user's ``id`` (``email`` is accepted and ignored)
+    plus columns from BULK_UPDATE_COLUMNS. Each chunk is one RPC call; if it is
+    rejected (e.g. the migration is missing), that chunk falls back to per-row
+    updates.
+    """
+    written = 0
+    fallback_rows = 0
+    failed = 0
+    chunk_size = max(1, int(chunk_size))
+    for start in range(0, len(rows), chunk_size):
+        chunk = []
+        for r in rows[start:start + chunk_size]:
+            if r.get('id') is None:
+                continue
+            payload = {k: v for k, v in r.items() if k != 'email'}
+            unknown = set(payload) - BULK_UPDATE_COLUMNS - {'id'}
+            if unknown:
+                raise ValueError(f'bulk_update_users cannot set {sorted(unknown)}')
+            chunk.append(payload)
+        if not chunk:
+            continue
+        try:
+            resp = supabase.rpc('bulk_update_users', {'payload': chunk}).execute()
+            written += _updated_count(resp.data, len(chunk))
+            continue
+        except Exception as e:
+            print(f"[BULK-WRITE] bulk_update_users RPC for {len(chunk)} rows failed, falling back to per-row updates: {e}")
+        for row in chunk:
+            payload = {k: v for k, v in row.items() if k != 'id'}
+            try:
+                supabase.table('users').update(payload).eq('id', row['id']).execute()
+                written += 1
+                fallback_rows += 1
+            except Exception as e:
+                failed += 1
+                print(f"[BULK-WRITE] Update failed for user {row['id']}: {e}")
+    return {'written': written, 'fallback_rows': fallback_rows, 'failed': failed}
@@ -0,0 +1,166 @@
+"""
+Single inference path for every career program (IT, CS, ...).
+
+Programs register their artifact path (and, optionally, the feature length the
+frontend sends) once at import. Forecasts validate the grade vector against the
+artifact's ``n_features_in_`` and never train on the request path; a missing or
+mismatched model is reported as an error so it can be fixed via /train or
+/bootstrap-model. ``warm()`` loads and exercises every program at startup.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.career_ranking import rank_top_careers
+from app.services.forecast_cache import get_forecast_cache, grades_fingerprint
+from app.services.model_registry import ModelRegistry, get_model_registry
+
+
+class CareerEngine:
+    def __init__(self, registry: ModelRegistry, top_k: int = 6):
+        self.registry = registry
+        self.top_k = int(top_k)
+        self._expected: Dict[str, Optional[int]] = {}
+
+    def register(self, program: str, path: str, feature_len: Optional[int] = None) -> None:
+        self.registry.register(program, path)
+        self._expected[program] = int(feature_len) if feature_len else None
+
+    def programs(self) -> List[str]:
+        return list(self._expected)
+
+    def _model(self, program: str):
+        bundle, error = self.registry.get_inference_bundle(program)
+        if bundle is None:
+            return None, None, error
+        model = bundle.get('model')
+        labels = list(bundle.get('labels') or [])
+        if model is None or not labels:
+            return None, None, 'Model bundle missing required keys {model, labels}'
+        return model, labels, None
+
+    def forecast(self, program: str, grades) -> Tuple[Tuple[List[str], List[float]], Optional[str]]:
+        """Top-k careers for one grade vector: ((labels, scores), error)."""
+        try:
+            if not grades or not isinstance(grades, list):
+                return ([], []), 'Invalid or empty grades input'
+
+            # Identical grades against the same model artifact give the same answer
+            cache = get_forecast_cache()
+            model_version = self.registry.version(program)
+            cache_key = grades_fingerprint(program, model_version, grades) if model_version else None
+            cached = cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cached, None
+
+            model, labels, error = self._model(program)
+            if model is None:
+                return ([], []), error
+            n_features = getattr(model, 'n_features_in_', None)
+            if n_features is not None and len(grades) != n_features:
+                return ([], []), f'Expected {n_features} grades, got {len(grades)}'
+
+            y_pred = model.predict(np.array([[float(g) for g in grades]]))
+            if y_pred.ndim == 1:
+                return ([], []), 'Model output shape invalid (expected multi-target)'
+            top, top_vals, constant = rank_top_careers(y_pred, k=self.top_k)
+            if constant[0]:
+                return ([], []), 'Model produced constant scores'
+            result = ([labels[j] for j in top[0]], [round(float(v), 4) for v in top_vals[0]])
+            if cache_key:
+                cache.put(cache_key, result)
+            return result, None
+        except Exception as e:
+            return ([], []), f'Model inference error: {e}'
+
+    def forecast_batch(self, program: str, grade_rows) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Vectorized counterpart of forecast for N students.
+        Returns (results, error) where results[i] is {'career_top_jobs', 'career_top_jobs_scores'}
+        or {'error': ...} for rows that could not be scored.
+        """
+        try:
+            if not isinstance(grade_rows, list) or not grade_rows:
+                return [], 'Invalid or empty grades input'
+            model, labels, error = self._model(program)
+            if model is None:
+                return [], error
+
+            n_features = getattr(model, 'n_features_in_', None)
+            if n_features is None:
+                n_features = max((len(r) for r in grade_rows if isinstance(r, list)), default=0)
+            results: List[Optional[Dict[str, Any]]] = [None] * len(grade_rows)
+            valid_idx = []
+            for i, row in enumerate(grade_rows):
+                if not isinstance(row, list) or not row:
+                    results[i] = {'error': 'Invalid or empty grades input'}
+                elif len(row) != n_features:
+                    results[i] = {'error': f'Expected {n_features} grades, got {len(row)}'}
+                else:
+                    valid_idx.append(i)
+            if not valid_idx:
+                return results, None
+
+            X = np.asarray([grade_rows[i] for i in valid_idx], dtype=float)
+            y_pred = model.predict(X)
+            if y_pred.ndim == 1:
+                return [], 'Model output shape invalid (expected multi-target)'
+
+            top, top_vals, constant = rank_top_careers(y_pred, k=self.top_k)
+            top_vals = np.round(top_vals, 4)
+            for row_pos, i in enumerate(valid_idx):
+                if constant[row_pos]:
+                    results[i] = {'error': 'Model produced constant scores'}
+                    continue
+                results[i] = {
+                    'career_top_jobs': [labels[j] for j in top[row_pos]],
+                    'career_top_jobs_scores': top_vals[row_pos].tolist(),
+                }
+            return results, None
+        except Exception as e:
+            return [], f'Model inference error: {e}'
+
+    def warm(self, programs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Load every program's serving model and run one prediction through it.
+
+        Feature-length mismatches against the configured length are reported,
+        not repaired; retraining stays an explicit admin action.
+        """
+        report: Dict[str, Any] = {}
+        for program in programs or self.programs():
+            started = time.perf_counter()
+            model, labels, error = self._model(program)
+            if model is None:
+                report[program] = {'error': error}
+                continue
+            loaded = time.perf_counter()
+            n_features = int(getattr(model, 'n_features_in_', 0) or 0)
+            entry: Dict[str, Any] = {'feature_len': n_features, 'labels': len(labels)}
+            expected = self._expected.get(program)
+            if expected and n_features != expected:
+                entry['error'] = f'Artifact expects {n_features} grades, configured for {expected}'
+            try:
+                model.predict(np.zeros((1, n_features)))
+            except Exception as e:
+                entry['error'] = f'Warm-up prediction failed: {e}'
+            entry['load_ms'] = round((loaded - started) * 1000.0, 2)
+            entry['warm_ms'] = round((time.perf_counter() - loaded) * 1000.0, 2)
+            report[program] = entry
+        return report
+
+
+_engine: Optional[CareerEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_career_engine() -> CareerEngine:
+    """Return the process-wide career engine (created on first use)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = CareerEngine(get_model_registry())
+    return _engine
@@ -0,0 +1,40 @@
+"""
+Vectorized top-k career selection shared by batch inference, shadow scoring and
+model tooling.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+def rank_top_careers(y_pred: np.ndarray, k: int = 6) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Min-max normalise each row of model scores and pick its top-k labels.
+
+    Returns (top_idx, top_probs, constant) where top_idx/top_probs are (rows x k),
+    ordered by score desc with ties broken by label index (like a stable sorted()),
+    and ``constant`` flags rows whose scores are all equal.
+    """
+    y_pred = np.atleast_2d(np.asarray(y_pred, dtype=np.float64))
+    s_min = y_pred.min(axis=1, keepdims=True)
+    s_max = y_pred.max(axis=1, keepdims=True)
+    span = s_max - s_min
+    constant = span[:, 0] == 0
+    probs = (y_pred - s_min) / np.where(span == 0, 1.0, span)
+
+    k = min(k, probs.shape[1])
+    if k < probs.shape[1]:
+        top = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+    else:
+        top = np.tile(np.arange(probs.shape[1]), (probs.shape[0], 1))
+    top_vals = np.take_along_axis(probs, top, axis=1)
+    # argpartition picks arbitrarily among values tied with the k-th; those rows
+    # need a stable sort to keep the lowest label indices
+    tied = (probs >= top_vals.min(axis=1, keepdims=True)).sum(axis=1) > k
+    if tied.any():
+        top[tied] = np.argsort(-probs[tied], axis=1, kind='stable')[:, :k]
+        top_vals = np.take_along_axis(probs, top, axis=1)
+    order = np.lexsort((top, -top_vals), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_vals = np.take_along_axis(top_vals, order, axis=1)
+    return top, top_vals, constant
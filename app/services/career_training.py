@@ -0,0 +1,135 @@
+"""
+Career forest training helpers shared by the Objective 1 blueprints.
+
+Training runs inside background jobs (see app.services.jobs): the forest is
+grown in slices of trees so progress can be reported and cancellation honoured
+between slices, CPU use is capped by TRAINING_N_JOBS, and the finished bundle
+is published atomically.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from app.services.compiled_forest import compile_forest, publish_compiled
+from app.services.jobs import Job
+from app.services.model_registry import get_model_registry, publish_bundle
+
+
+def training_cpu_budget() -> int:
+    """Number of cores a training job may use (TRAINING_N_JOBS, default half the machine)."""
+    cpus = os.cpu_count() or 1
+    try:
+        budget = int(os.getenv('TRAINING_N_JOBS') or 0)
+    except ValueError:
+        budget = 0
+    if budget <= 0:
+        budget = max(1, cpus // 2)
+    return max(1, min(budget, cpus))
+
+
+def fit_forest(X: np.ndarray, Y: np.ndarray, job: Optional[Job] = None, n_estimators: int = 180,
+               max_depth: Optional[int] = 22, random_state: int = 42, step: int = 20,
+               model: Optional[RandomForestRegressor] = None) -> RandomForestRegressor:
+    """Grow a RandomForestRegressor in slices of ``step`` trees.
+
+    Using warm_start with the same random_state yields the same forest as a single
+    fit() call, while giving us checkpoints for progress and cancellation.
+    """
+    n_jobs = training_cpu_budget()
+    if model is None:
+        model = RandomForestRegressor(random_state=random_state, n_estimators=0,
+                                      max_depth=max_depth, n_jobs=n_jobs, warm_start=True)
+    else:
+        model.set_params(warm_start=True, n_jobs=n_jobs)
+    start_trees = len(getattr(model, 'estimators_', []) or [])
+    target = start_trees + int(n_estimators)
+    built = start_trees
+    try:
+        from threadpoolctl import threadpool_limits
+    except Exception:  # pragma: no cover - threadpoolctl ships with scikit-learn
+        threadpool_limits = None
+
+    while built < target:
+        if job is not None:
+            job.check_cancelled()
+        built = min(target, built + max(1, int(step)))
+        model.set_params(n_estimators=built)
+        if threadpool_limits is not None:
+            with threadpool_limits(limits=n_jobs):
+                model.fit(X, Y)
+        else:
+            model.fit(X, Y)
+        if job is not None:
+            job.set_progress((built - start_trees) / max(1, target - start_trees),
+                             f'{built - start_trees}/{target - start_trees} trees')
+    model.set_params(warm_start=False, n_jobs=None)
+    return model
+
+
+def hyperparams_path(model_path: str) -> str:
+    base, _ = os.path.splitext(os.path.abspath(model_path))
+    return f'{base}.config.json'
+
+
+def load_hyperparams(model_path: str, n_estimators: int, max_depth: Optional[int]) -> Dict[str, Any]:
+    """Forest size for a model artifact: the promoted config next to it, else the given defaults."""
+    params = {'n_estimators': int(n_estimators), 'max_depth': max_depth}
+    try:
+        with open(hyperparams_path(model_path), 'r', encoding='utf-8') as fh:
+            promoted = json.load(fh)
+        if int(promoted.get('n_estimators') or 0) > 0:
+            params['n_estimators'] = int(promoted['n_estimators'])
+        if 'max_depth' in promoted:
+            params['max_depth'] = int(promoted['max_depth']) if promoted['max_depth'] else None
+    except (OSError, ValueError):
+        pass
+    return params
+
+
+def save_hyperparams(model_path: str, params: Dict[str, Any]) -> str:
+    path = hyperparams_path(model_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(params, fh, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def retire_oldest_trees(model: RandomForestRegressor, max_trees: Optional[int]) -> int:
+    """Drop the oldest trees so at most ``max_trees`` remain; returns how many were removed.
+
+    Trees are appended in training order, so the head of ``estimators_`` holds the
+    ones fitted on the oldest cohorts.
+    """
+    estimators = list(getattr(model, 'estimators_', []) or [])
+    if not max_trees or len(estimators) <= max_trees:
+        return 0
+    removed = len(estimators) - int(max_trees)
+    model.estimators_ = estimators[removed:]
+    model.set_params(n_estimators=len(model.estimators_))
+    return removed
+
+
+def publish_career_model(program: str, model: RandomForestRegressor, labels, path: str) -> Dict[str, Any]:
+    """Atomically publish a trained bundle and drop the registry's stale copy."""
+    bundle = {'model': model, 'labels': list(labels)}
+    published = publish_bundle(bundle, path)
+    # Compile right away so the first request after training does not pay for it
+    try:
+        st = os.stat(published)
+        publish_compiled(compile_forest(bundle), published, (st.st_mtime_ns, st.st_size))
+    except Exception as e:
+        print(f"[TRAINING] Could not compile {program} model: {e}")
+    get_model_registry().invalidate(program)
+    return {
+        'program': program,
+        'model_path': published,
+        'labels_count': len(bundle['labels']),
+        'feature_len': int(getattr(model, 'n_features_in_', 0)),
+        'n_estimators': len(getattr(model, 'estimators_', []) or []),
+    }
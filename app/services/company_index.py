@@ -0,0 +1,709 @@
+"""
+Process-level index of the ``companies`` catalog for objective 3 ranking.
+
+The catalog is loaded once into unit-normalised (N x 6) ``riasec_weights`` and
+``skills_vector`` matrices plus the display metadata for each company. After
+that only rows whose ``updated_at`` is at or past the last watermark are fetched
+(at most once per COMPANY_INDEX_REFRESH_SECONDS, in the background), and a full
+reload every COMPANY_INDEX_FULL_RELOAD_SECONDS drops hard-deleted rows.
+
+Ranking is one matrix-vector product over the combined (N x 12) matrix, taken
+in blocks with an argpartition top-k per block. With COMPANY_ANN=true, catalogs
+of COMPANY_ANN_MIN_ROWS or more are ranked through an inverted-file (IVF) index
+instead; benchmarks/bench_company_rank.py reports latency and recall for both.
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.supabase_client import get_supabase_client
+
+VECTOR_DIM = 6
+# Blend used by objective 3: 0.6 * cosine(skills) + 0.4 * cosine(riasec)
+DEFAULT_WEIGHTS = (0.6, 0.4)
+FETCH_PAGE_SIZE = 1000
+TOP_K_SAMPLE = 1024
+# Company fields that recommendation requests can filter on
+FILTER_FIELDS = ('roles', 'locations', 'industry', 'company_size', 'hiring_tags')
+
+
+def coerce_vector(val) -> List[float]:
+    """Accept numeric[], a python list, or a Postgres array string like "{0.1,0.2,...}"."""
+    if isinstance(val, list):
+        try:
+            return [float(x) for x in val]
+        except Exception:
+            return []
+    if isinstance(val, str):
+        s = val.strip()
+        if s.startswith('{') and s.endswith('}'):
+            try:
+                parts = [p.strip() for p in s[1:-1].split(',') if p.strip()]
+                return [float(p) for p in parts]
+            except Exception:
+                return []
+    return []
+
+
+def unit_vector(values: Sequence[float]) -> np.ndarray:
+    """Scale to unit length; anything that is not a 6-vector scores 0 against every user."""
+    vec = np.asarray(values, dtype=np.float64)
+    if vec.shape != (VECTOR_DIM,):
+        return np.zeros(VECTOR_DIM, dtype=np.float64)
+    norm = math.sqrt(float(vec @ vec)) or 1e-9
+    return vec / norm
+
+
+def _is_active(val) -> bool:
+    # CSV imports have stored the flag as text; treat anything but an explicit false as active
+    if isinstance(val, str):
+        return val.strip().lower() not in ('false', 'f', '0', 'no')
+    return val is None or bool(val)
+
+
+def display_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    """The company fields returned with a recommendation (everything but the score)."""
+    return {
+        'title': row.get('name'),
+        'description': row.get('description') or '',
+        'location': (row.get('locations') or ['Remote'])[0],
+        'locations': row.get('locations') or [],
+        'url': row.get('website') or '',
+        'logo_url': row.get('logo_url') or '',
+        'roles': row.get('roles') or [],
+        'industry': row.get('industry') or '',
+        'company_size': row.get('company_size') or '',
+        'linkedin_url': row.get('linkedin_url') or '',
+        'hiring_tags': row.get('hiring_tags') or [],
+    }
+
+
+def top_k_desc(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, score desc then index asc."""
+    n = scores.shape[0]
+    k = min(int(k), n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if n >= TOP_K_SAMPLE * 4 and k <= TOP_K_SAMPLE // 4:
+        # The k-th best of a strided sample is a lower bound for the k-th best
+        # overall, so only scores at or above it can make the cut
+        sample = scores[::n // TOP_K_SAMPLE]
+        floor = np.partition(sample, sample.size - k)[sample.size - k]
+        cand = np.flatnonzero(scores >= floor)
+        # Heavy ties (e.g. an all-zero query) can keep every row; rank those directly
+        if cand.size <= n // 2:
+            return cand[top_k_desc(scores[cand], k)]
+    if k < n:
+        part = np.argpartition(-scores, k - 1)[:k]
+        kth = scores[part].min()
+        # Keep the lowest indices among scores tied with the k-th, like a stable sort
+        if int((scores >= kth).sum()) > k:
+            above = np.flatnonzero(scores > kth)
+            tied = np.flatnonzero(scores == kth)[:k - above.size]
+            part = np.concatenate([above, tied])
+    else:
+        part = np.arange(n)
+    return part[np.lexsort((part, -scores[part]))]
+
+
+def blocked_top_k(matrix: np.ndarray, query: np.ndarray, k: int, block_rows: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k of ``matrix @ query`` scored ``block_rows`` rows at a time.
+
+    After the first block, rows scoring below the running k-th best are dropped
+    with one comparison, so the working set stays cache-sized and only a handful
+    of candidates per block are merged, whatever the catalog size.
+    Returns (rows, scores) ordered like ``top_k_desc``.
+    """
+    n = matrix.shape[0]
+    k = min(int(k), n)
+    block_rows = max(k, int(block_rows), 1)
+    rows = np.empty(0, dtype=np.int64)
+    vals = np.empty(0, dtype=np.float64)
+    for start in range(0, n, block_rows):
+        scores = matrix[start:start + block_rows] @ query
+        if vals.size < k:
+            sel = top_k_desc(scores, k)
+        else:
+            sel = np.flatnonzero(scores >= vals[k - 1])
+            if not sel.size:
+                continue
+        rows = np.concatenate([rows, sel + start])
+        vals = np.concatenate([vals, scores[sel]])
+        order = np.lexsort((rows, -vals))[:k]
+        rows, vals = rows[order], vals[order]
+    return rows, vals
+
+
+def batch_top_k(matrix: np.ndarray, queries: np.ndarray, k: int, max_cells: int = 4_000_000) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k rows of ``matrix`` for every query row: ``blocked_top_k`` for many users at once.
+
+    Scores (queries x block) at a time with one matrix product, keeping the
+    temporary under ``max_cells`` floats. Per query, only scores at or above its
+    running k-th best (or, in the first block, a sampled lower bound for it)
+    become candidates, and candidates are merged with one grouped sort.
+    Returns (rows, scores), each (queries x k), ordered score desc then row asc.
+    """
+    queries = np.atleast_2d(queries)
+    n_q, n = queries.shape[0], matrix.shape[0]
+    k = min(int(k), n)
+    if k <= 0 or n_q == 0:
+        return np.empty((n_q, 0), dtype=np.int64), np.empty((n_q, 0), dtype=np.float64)
+    block_rows = max(k, int(max_cells) // n_q)
+    best_rows = best_vals = None
+    q_ids = np.arange(n_q)
+    for start in range(0, n, block_rows):
+        scores = queries @ matrix[start:start + block_rows].T
+        if best_vals is None:
+            sample = scores[:, ::max(1, scores.shape[1] // max(4 * k, 256))]
+            floor = np.partition(sample, sample.shape[1] - k, axis=1)[:, sample.shape[1] - k]
+        else:
+            floor = best_vals[:, k - 1]
+        # flatnonzero + divmod is much faster than a 2-D nonzero on a sparse mask
+        hits = np.flatnonzero(scores >= floor[:, None])
+        if not hits.size:
+            continue
+        qi, cj = np.divmod(hits, scores.shape[1])
+        q_all, rows, vals = qi, cj + start, scores[qi, cj]
+        if best_vals is not None:
+            q_all = np.concatenate([np.repeat(q_ids, k), q_all])
+            rows = np.concatenate([best_rows.ravel(), rows])
+            vals = np.concatenate([best_vals.ravel(), vals])
+        order = np.lexsort((rows, -vals, q_all))
+        q_sorted = q_all[order]
+        # Every query has at least k entries; keep the first k of each group
+        rank = np.arange(order.size) - np.searchsorted(q_sorted, q_sorted)
+        keep = order[rank < k]
+        best_rows = rows[keep].reshape(n_q, k)
+        best_vals = vals[keep].reshape(n_q, k)
+    return best_rows, best_vals
+
+
+def _nearest_centroid(matrix: np.ndarray, centroids: np.ndarray, block_rows: int = 8192) -> np.ndarray:
+    # argmin ||x - c||^2 == argmax (2 x.c - ||c||^2); blocked to bound the (rows x lists) temporary
+    half_norms = 0.5 * np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(matrix.shape[0], dtype=np.int64)
+    for start in range(0, matrix.shape[0], block_rows):
+        labels[start:start + block_rows] = np.argmax(matrix[start:start + block_rows] @ centroids.T - half_norms, axis=1)
+    return labels
+
+
+class IvfIndex:
+    """Inverted-file ANN over the combined 12-dim company vectors.
+
+    Rows are bucketed by their nearest k-means centroid; a query scores the
+    centroids, then only the rows in its ``nprobe`` best lists.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray):
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, nlist: Optional[int] = None, centroids: Optional[np.ndarray] = None,
+              iterations: int = 8, sample_rows: int = 20000, seed: int = 0) -> 'IvfIndex':
+        """Train centroids on a sample (unless reusing ``centroids``) and bucket every row."""
+        n = matrix.shape[0]
+        if centroids is None:
+            rng = np.random.default_rng(seed)
+            nlist = max(1, min(n, int(nlist or round(math.sqrt(n)))))
+            sample = matrix[rng.choice(n, min(n, max(sample_rows, nlist * 40)), replace=False)]
+            centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = _nearest_centroid(sample, centroids)
+                counts = np.bincount(labels, minlength=nlist)
+                filled = counts > 0
+                for d in range(matrix.shape[1]):
+                    sums = np.bincount(labels, weights=sample[:, d], minlength=nlist)
+                    centroids[filled, d] = sums[filled] / counts[filled]
+                if not filled.all():
+                    # Restart empty lists from random sample rows
+                    centroids[~filled] = sample[rng.choice(sample.shape[0], int((~filled).sum()), replace=False)]
+        labels = _nearest_centroid(matrix, centroids)
+        order = np.argsort(labels, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=centroids.shape[0]))])
+        return cls(centroids, order, offsets)
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int, nprobe: int = 16) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k of ``matrix @ query``: exact scores within the probed lists."""
+        probe = np.argsort(-(self.centroids @ query), kind='stable')
+        take = max(1, min(int(nprobe), self.nlist))
+        # Keep probing past nprobe if the chosen lists hold fewer than k rows
+        sizes = np.diff(self.offsets)[probe]
+        take = max(take, min(self.nlist, int(np.searchsorted(np.cumsum(sizes), k)) + 1))
+        cand = np.sort(np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in probe[:take]]))
+        scores = matrix[cand] @ query
+        top = top_k_desc(scores, k)
+        return cand[top], scores[top]
+
+
+def _filter_key(value) -> str:
+    return ' '.join(str(value).split()).casefold()
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Keep known fields with at least one value; scalars become one-item lists."""
+    out: Dict[str, List[str]] = {}
+    for field in FILTER_FIELDS:
+        raw = (filters or {}).get(field)
+        values = raw if isinstance(raw, (list, tuple)) else [raw]
+        keys = sorted({_filter_key(v) for v in values if v is not None and str(v).strip()})
+        if keys:
+            out[field] = keys
+    return out
+
+
+class FilterIndex:
+    """Inverted index from company field values to catalog rows.
+
+    Each value's postings are kept as whichever is smaller: a sorted row-id
+    array or a packed bitset over the snapshot (frequent values). A query ORs
+    the requested values within a field and ANDs across fields, yielding the
+    candidate rows to score.
+    """
+
+    def __init__(self, meta: List[Dict[str, Any]]):
+        self.size = len(meta)
+        postings: Dict[str, Dict[str, List[int]]] = {f: {} for f in FILTER_FIELDS}
+        self.labels: Dict[str, Dict[str, str]] = {f: {} for f in FILTER_FIELDS}
+        for i, fields in enumerate(meta):
+            for field in FILTER_FIELDS:
+                values = fields.get(field)
+                if field == 'locations' and not values:
+                    # Shown to students as 'Remote', so filter it that way too
+                    values = ['Remote']
+                if not isinstance(values, (list, tuple)):
+                    values = [values] if values else []
+                for v in values:
+                    key = _filter_key(v)
+                    if not key:
+                        continue
+                    rows = postings[field].setdefault(key, [])
+                    if not rows or rows[-1] != i:
+                        rows.append(i)
+                    self.labels[field].setdefault(key, str(v).strip())
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+        bitset_min = max(1, self.size // 32)  # 4 bytes per id vs 1 bit per row
+        for field, by_value in postings.items():
+            self.postings[field] = {}
+            for key, rows in by_value.items():
+                arr = np.asarray(rows, dtype=np.int32)
+                if len(rows) >= bitset_min:
+                    mask = np.zeros(self.size, dtype=bool)
+                    mask[arr] = True
+                    arr = np.packbits(mask)
+                self.postings[field][key] = arr
+
+    def _field_mask(self, field: str, keys: List[str]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        for key in keys:
+            rows = self.postings[field].get(key)
+            if rows is None:
+                continue
+            if rows.dtype == np.uint8:
+                mask |= np.unpackbits(rows, count=self.size).view(bool)
+            else:
+                mask[rows] = True
+        return mask
+
+    def candidates(self, filters: Dict[str, List[str]]) -> np.ndarray:
+        """Rows matching any value within each filtered field and every filtered field."""
+        mask = None
+        # Most selective field first so an empty result stops early
+        for field in sorted(filters, key=lambda f: sum(self.postings[f][k].size for k in filters[f] if k in self.postings[f])):
+            fmask = self._field_mask(field, filters[field])
+            mask = fmask if mask is None else mask & fmask
+            if not mask.any():
+                break
+        if mask is None:
+            return np.arange(self.size)
+        return np.flatnonzero(mask)
+
+    def facets(self, limit: int = 100) -> Dict[str, List[Dict[str, Any]]]:
+        """Most common values per field, with company counts."""
+        out = {}
+        for field, by_value in self.postings.items():
+            counts = [(int(np.unpackbits(r, count=self.size).sum()) if r.dtype == np.uint8 else int(r.size), key)
+                      for key, r in by_value.items()]
+            counts.sort(key=lambda c: (-c[0], c[1]))
+            out[field] = [{'value': self.labels[field][key], 'count': n} for n, key in counts[:limit]]
+        return out
+
+
+class _Snapshot:
+    """Immutable view of the catalog; refreshes build a new one and swap it in.
+
+    ``combined`` is (N x 12): the unit skills vector followed by the unit RIASEC
+    vector, so a weighted blend of both cosines is a single matrix-vector product.
+    ``digest`` identifies the catalog contents (ids and updated_at, in id order),
+    so every process holding the same catalog reports the same value.
+    ``ann`` and ``filters`` are attached later, once built for this snapshot.
+    """
+
+    __slots__ = ('ids', 'combined', 'skills', 'riasec', 'meta', 'updated_at', 'row_of', 'version', 'watermark',
+                 'digest', 'ann', 'filters')
+
+    def __init__(self, ids, combined, meta, updated_at, version, watermark):
+        self.ids = ids
+        self.combined = combined
+        self.skills = combined[:, :VECTOR_DIM]
+        self.riasec = combined[:, VECTOR_DIM:]
+        self.meta = meta
+        self.updated_at = updated_at
+        self.row_of = {int(cid): i for i, cid in enumerate(ids.tolist())}
+        self.version = version
+        self.watermark = watermark
+        by_id = np.argsort(ids, kind='stable')
+        h = hashlib.sha1(ids[by_id].astype('<i8').tobytes())
+        h.update('\x00'.join(str(updated_at[i]) for i in by_id.tolist()).encode('utf-8'))
+        self.digest = h.hexdigest()[:16]
+        self.ann: Optional[IvfIndex] = None
+        self.filters: Optional[FilterIndex] = None
+
+    @classmethod
+    def empty(cls) -> '_Snapshot':
+        return cls(np.zeros(0, dtype=np.int64), np.zeros((0, 2 * VECTOR_DIM), dtype=np.float64), [], [], 0, None)
+
+
+class CompanyIndex:
+    def __init__(self, refresh_interval: float = 60.0, full_reload_interval: float = 3600.0,
+                 block_rows: int = 65536, ann: bool = False, ann_min_rows: int = 100000, ann_nprobe: int = 16):
+        self.refresh_interval = max(0.0, float(refresh_interval))
+        self.full_reload_interval = max(self.refresh_interval, float(full_reload_interval))
+        self.block_rows = max(1, int(block_rows))
+        self.ann_enabled = bool(ann)
+        self.ann_min_rows = max(1, int(ann_min_rows))
+        self.ann_nprobe = max(1, int(ann_nprobe))
+        self._snapshot = _Snapshot.empty()
+        self._loaded = False
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._ann_lock = threading.Lock()
+        self._filters_lock = threading.Lock()
+        self._ann_thread: Optional[threading.Thread] = None
+        self._ann_centroids: Optional[np.ndarray] = None
+        self.ann_build_seconds: Optional[float] = None
+        self._last_check = 0.0
+        self._last_full = 0.0
+        self.last_error: Optional[str] = None
+        self.refreshes = 0
+        self.full_reloads = 0
+        self.rows_fetched = 0
+        self._listeners: List[Callable[[_Snapshot], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+
+    # -- loading -----------------------------------------------------------
+
+    def _fetch(self, since: Optional[str]) -> List[Dict[str, Any]]:
+        supabase = get_supabase_client()
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            # Select all columns to support legacy/CSV-imported names like riasec_wei, skills_vect.
+            # gte, not gt: rows committed later with the same timestamp are re-read, not missed
+            q = supabase.table('companies').select('*')
+            if since:
+                q = q.gte('updated_at', since)
+            page = q.order('updated_at').order('id').range(start, start + FETCH_PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < FETCH_PAGE_SIZE:
+                return rows
+            start += FETCH_PAGE_SIZE
+
+    def _apply(self, current: _Snapshot, rows: List[Dict[str, Any]], full: bool) -> _Snapshot:
+        base = _Snapshot.empty() if full else current
+        upserts: Dict[int, Tuple[np.ndarray, Dict[str, Any], Any]] = {}
+        removed = set()
+        watermark = base.watermark
+
+        for row in rows:
+            try:
+                cid = int(row.get('id'))
+            except Exception:
+                continue
+            stamp = row.get('updated_at')
+            if stamp and (watermark is None or str(stamp) > watermark):
+                watermark = str(stamp)
+            i = base.row_of.get(cid)
+            if i is not None and base.updated_at[i] == stamp:
+                continue
+            if not _is_active(row.get('active')):
+                upserts.pop(cid, None)
+                if i is not None:
+                    removed.add(cid)
+                continue
+            removed.discard(cid)
+            s = unit_vector(coerce_vector(row.get('skills_vector') or row.get('skills_vect') or [0] * VECTOR_DIM))
+            r = unit_vector(coerce_vector(row.get('riasec_weights') or row.get('riasec_wei') or [0] * VECTOR_DIM))
+            upserts[cid] = (np.concatenate([s, r]), display_fields(row), stamp)
+
+        if not full and not upserts and not removed:
+            return current
+        ids = base.ids
+        combined = base.combined.copy()
+        meta = list(base.meta)
+        updated = list(base.updated_at)
+        new_ids, new_vecs = [], []
+        for cid, (vec, fields, stamp) in upserts.items():
+            i = base.row_of.get(cid)
+            if i is None:
+                new_ids.append(cid)
+                new_vecs.append(vec)
+                meta.append(fields)
+                updated.append(stamp)
+            else:
+                combined[i], meta[i], updated[i] = vec, fields, stamp
+        if new_ids:
+            ids = np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)])
+            combined = np.vstack([combined, np.asarray(new_vecs, dtype=np.float64)])
+        if removed:
+            keep = np.fromiter((cid not in removed for cid in ids.tolist()), dtype=bool, count=len(ids))
+            ids, combined = ids[keep], combined[keep]
+            meta = [m for m, kept in zip(meta, keep) if kept]
+            updated = [u for u, kept in zip(updated, keep) if kept]
+        # A full reload that found exactly what we already had keeps the version
+        if full and current.version and np.array_equal(ids, current.ids) and updated == current.updated_at:
+            return current
+        return _Snapshot(ids, np.ascontiguousarray(combined), meta, updated, current.version + 1, watermark)
+
+    def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """Fetch rows changed since the watermark (or the whole catalog) and swap in a new snapshot."""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            now = time.monotonic()
+            full = full or not self._loaded or now - self._last_full >= self.full_reload_interval
+            try:
+                current = self._snapshot
+                rows = self._fetch(None if full else current.watermark)
+                self._snapshot = self._apply(current, rows, full)
+                self._loaded = True
+                self.refreshes += 1
+                self.rows_fetched += len(rows)
+                self.last_error = None
+                if full:
+                    self.full_reloads += 1
+                    self._last_full = now
+                if self._snapshot is not current:
+                    # Build the filter postings here, off the request path
+                    self._filter_index(self._snapshot)
+                    print(f"[COMPANY-INDEX] {'Loaded' if full else 'Updated'} catalog: "
+                          f"{len(self._snapshot.ids)} companies (version {self._snapshot.version}, {len(rows)} rows fetched)")
+                    if current.version and self._snapshot.digest != current.digest:
+                        self._notify(self._snapshot)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[COMPANY-INDEX] Refresh failed: {e}")
+            finally:
+                self._last_check = time.monotonic()
+            return {**self.stats(), 'seconds': round(time.perf_counter() - started, 3)}
+
+    def add_listener(self, fn: Callable[[_Snapshot], None]) -> None:
+        """Call ``fn(snapshot)`` after a refresh changes an already-loaded catalog."""
+        self._listeners.append(fn)
+
+    def _notify(self, snap: _Snapshot) -> None:
+        for fn in list(self._listeners):
+            try:
+                fn(snap)
+            except Exception as e:
+                print(f"[COMPANY-INDEX] Change listener failed: {e}")
+
+    def watch(self) -> None:
+        """Refresh every refresh interval even without traffic, so listeners see catalog changes."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        def loop():
+            while True:
+                self.refresh()
+                time.sleep(max(1.0, self.refresh_interval))
+
+        self._watcher = threading.Thread(target=loop, name='gradalyze-company-watch', daemon=True)
+        self._watcher.start()
+
+    def load_rows(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Replace the catalog with ``rows`` without touching the database (benchmarks, offline tooling)."""
+        with self._refresh_lock:
+            self._snapshot = self._apply(self._snapshot, rows, full=True)
+            self._loaded = True
+            self._last_check = self._last_full = time.monotonic()
+        return self.stats()
+
+    def _ensure_fresh(self) -> None:
+        if not self._loaded:
+            # First use blocks so the first request still gets results
+            self.refresh()
+            return
+        if time.monotonic() - self._last_check < self.refresh_interval:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._last_check = time.monotonic()
+        self._thread = threading.Thread(target=self.refresh, name='gradalyze-company-index', daemon=True)
+        self._thread.start()
+
+    # -- ranking -----------------------------------------------------------
+
+    def snapshot(self) -> _Snapshot:
+        self._ensure_fresh()
+        return self._snapshot
+
+    def _ann_for(self, snap: _Snapshot) -> Optional[IvfIndex]:
+        if not self.ann_enabled or len(snap.ids) < self.ann_min_rows:
+            return None
+        if snap.ann is None:
+            self._start_ann_build(snap)
+        return snap.ann
+
+    def _start_ann_build(self, snap: _Snapshot) -> None:
+        # Built off the request path; exact ranking serves until it is attached
+        with self._ann_lock:
+            if self._ann_thread is not None and self._ann_thread.is_alive():
+                return
+
+            def build():
+                started = time.perf_counter()
+                try:
+                    prev = self._ann_centroids
+                    # Reassigning rows to the previous centroids is enough for incremental updates
+                    nlist = round(math.sqrt(len(snap.ids)))
+                    reuse = prev is not None and nlist / 2 <= prev.shape[0] <= nlist * 2
+                    snap.ann = IvfIndex.build(snap.combined, centroids=prev.copy() if reuse else None)
+                    self._ann_centroids = snap.ann.centroids
+                    self.ann_build_seconds = round(time.perf_counter() - started, 3)
+                    print(f"[COMPANY-INDEX] Built ANN index over {len(snap.ids)} companies "
+                          f"({snap.ann.nlist} lists, {self.ann_build_seconds}s, centroids {'reused' if reuse else 'trained'})")
+                except Exception as e:
+                    print(f"[COMPANY-INDEX] ANN build failed: {e}")
+
+            self._ann_thread = threading.Thread(target=build, name='gradalyze-company-ann', daemon=True)
+            self._ann_thread.start()
+
+    def _filter_index(self, snap: _Snapshot) -> FilterIndex:
+        if snap.filters is None:
+            with self._filters_lock:
+                if snap.filters is None:
+                    snap.filters = FilterIndex(snap.meta)
+        return snap.filters
+
+    def catalog_version(self) -> str:
+        """Content digest of the catalog ranked by this process (see ``_Snapshot``)."""
+        return self.snapshot().digest
+
+    def candidates(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows of the current snapshot matching ``filters`` (None when nothing is filtered)."""
+        wanted = normalize_filters(filters)
+        if not wanted:
+            return None
+        return self._filter_index(self.snapshot()).candidates(wanted)
+
+    def facets(self, limit: int = 100) -> Dict[str, List[Dict[str, Any]]]:
+        return self._filter_index(self.snapshot()).facets(limit)
+
+    def _rank_rows(self, snap: _Snapshot, user_skills: Sequence[float], user_riasec: Sequence[float], k: int,
+                   weights: Tuple[float, float], exact: bool, filters: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        query = np.concatenate([weights[0] * unit_vector(user_skills), weights[1] * unit_vector(user_riasec)])
+        wanted = normalize_filters(filters)
+        if wanted:
+            cand = self._filter_index(snap).candidates(wanted)
+            scores = np.take(snap.combined, cand, axis=0) @ query
+            top = top_k_desc(scores, k)
+            return cand[top], scores[top]
+        ann = None if exact else self._ann_for(snap)
+        if ann is not None:
+            return ann.search(snap.combined, query, k, self.ann_nprobe)
+        return blocked_top_k(snap.combined, query, k, self.block_rows)
+
+    def rank(self, user_skills: Sequence[float], user_riasec: Sequence[float], k: int = 20,
+             weights: Tuple[float, float] = DEFAULT_WEIGHTS, exact: bool = False,
+             filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Top-k companies by weighted cosine similarity, each as display fields plus ``score``.
+
+        ``filters`` (roles, locations, industry, company_size, hiring_tags) narrow
+        the catalog through the inverted index first, and only those rows are
+        scored. Unfiltered queries use blocked exact top-k, or the IVF index when
+        enabled and the catalog is large enough (``exact=True`` forces exact).
+        """
+        snap = self.snapshot()
+        if not len(snap.ids):
+            return []
+        rows, scores = self._rank_rows(snap, user_skills, user_riasec, k, weights, exact, filters)
+        return [{**snap.meta[i], 'score': round(float(sc), 4)} for i, sc in zip(rows.tolist(), scores.tolist())]
+
+    def rank_ids(self, user_skills: Sequence[float], user_riasec: Sequence[float], k: int,
+                 weights: Tuple[float, float] = DEFAULT_WEIGHTS,
+                 filters: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Like ``rank`` but only (company ids, scores), ordered score desc then company id asc."""
+        snap = self.snapshot()
+        if not len(snap.ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        rows, scores = self._rank_rows(snap, user_skills, user_riasec, k, weights, True, filters)
+        ids = snap.ids[rows]
+        order = np.lexsort((ids, -scores))
+        return ids[order], scores[order]
+
+    def hydrate(self, company_ids: Sequence[int], scores: Sequence[float]) -> List[Dict[str, Any]]:
+        """Display fields plus ``company_id`` and ``score``; companies gone from the catalog are skipped."""
+        snap = self.snapshot()
+        out = []
+        for cid, sc in zip(company_ids, scores):
+            i = snap.row_of.get(int(cid))
+            if i is not None:
+                out.append({**snap.meta[i], 'company_id': int(cid), 'score': round(float(sc), 4)})
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            'companies': int(len(snap.ids)),
+            'version': snap.version,
+            'digest': snap.digest,
+            'watermark': snap.watermark,
+            'loaded': self._loaded,
+            'refreshes': self.refreshes,
+            'full_reloads': self.full_reloads,
+            'rows_fetched': self.rows_fetched,
+            'last_error': self.last_error,
+            'refresh_interval_seconds': self.refresh_interval,
+            'full_reload_interval_seconds': self.full_reload_interval,
+            'block_rows': self.block_rows,
+            'ann': {
+                'enabled': self.ann_enabled,
+                'min_rows': self.ann_min_rows,
+                'nprobe': self.ann_nprobe,
+                'active': snap.ann is not None,
+                'lists': snap.ann.nlist if snap.ann is not None else 0,
+                'build_seconds': self.ann_build_seconds,
+            },
+        }
+
+
+_index: Optional[CompanyIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_company_index() -> CompanyIndex:
+    """Return the process-wide company index (loaded on first use)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CompanyIndex(
+                    refresh_interval=float(os.getenv('COMPANY_INDEX_REFRESH_SECONDS', '60')),
+                    full_reload_interval=float(os.getenv('COMPANY_INDEX_FULL_RELOAD_SECONDS', '3600')),
+                    block_rows=int(os.getenv('COMPANY_RANK_BLOCK_ROWS', '65536')),
+                    ann=os.getenv('COMPANY_ANN', 'false').lower() == 'true',
+                    ann_min_rows=int(os.getenv('COMPANY_ANN_MIN_ROWS', '100000')),
+                    ann_nprobe=int(os.getenv('COMPANY_ANN_NPROBE', '16')),
+                )
+    return _index
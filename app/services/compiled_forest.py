@@ -0,0 +1,299 @@
+"""
+Array-backed inference for the career RandomForest.
+
+``compile_forest`` flattens every tree of a trained bundle (``{'model', 'labels'}``)
+into a handful of contiguous NumPy arrays: split feature, float32 threshold,
+an interleaved (left, right) children table and a float32 (nodes x outputs)
+value table. Leaves point to themselves, so prediction is at most ``max_depth``
+vectorized gather steps over a (rows x trees) node matrix instead of sklearn's
+per-tree dispatch.
+
+Alongside the serving arrays the artifact carries attribution tables: ``delta``
+holds each node's value minus its parent's value and ``bias`` the forest's root
+value. Walking a row's decision paths and summing ``delta`` per split feature
+yields per-feature contributions (Saabas-style) with
+``bias + contributions.sum(features) == predict``.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+COMPILED_FORMAT_VERSION = 1
+_ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+_ATTRIBUTION_NAMES = ('delta', 'bias')
+
+
+class CompiledForest:
+    """Flat, read-only representation of a multi-output regression forest."""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, labels: List[str], n_features: int, max_depth: int,
+                 meta: Optional[Dict[str, Any]] = None, delta: Optional[np.ndarray] = None,
+                 bias: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        # children[2 * node] is the left child, children[2 * node + 1] the right child
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.labels = list(labels)
+        self.n_features_in_ = int(n_features)
+        self.max_depth = int(max_depth)
+        self.meta = dict(meta or {})
+        if delta is None or bias is None:
+            delta, bias = attribution_tables(children, value, roots)
+        self.delta = delta
+        self.bias = bias
+
+    @property
+    def n_trees(self) -> int:
+        return int(self.roots.shape[0])
+
+    @property
+    def n_nodes(self) -> int:
+        return int(self.feature.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(getattr(self, name).nbytes for name in _ARRAY_NAMES + _ATTRIBUTION_NAMES))
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the (rows x trees) matrix of leaf node ids reached by each row."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_cols = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int64) * n_cols)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        for depth in range(self.max_depth):
+            go_right = np.take(flat, row_base + np.take(self.feature, nodes)) > np.take(self.threshold, nodes)
+            nxt = np.take(self.children, nodes * 2 + go_right)
+            # Most paths end well before max_depth; stop once nothing moved
+            if depth % 4 == 3 and np.array_equal(nxt, nodes):
+                break
+            nodes = nxt
+        return nodes
+
+    def predict(self, X: np.ndarray, chunk_size: int = 512) -> np.ndarray:
+        """Average leaf values over trees; same contract as RandomForestRegressor.predict."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'X has {X.shape[-1]} features, but the forest expects {self.n_features_in_}')
+        out = np.zeros((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_size):
+            leaves = self.apply(X[start:start + chunk_size])
+            acc = out[start:start + chunk_size]
+            if leaves.shape[0] <= 64:
+                acc += self.value[leaves].sum(axis=1, dtype=np.float64)
+            else:
+                # Per-tree accumulation avoids a (rows x trees x outputs) temporary
+                for t in range(self.n_trees):
+                    acc += self.value[leaves[:, t]]
+        out /= self.n_trees
+        return out
+
+    def contributions(self, X: np.ndarray, outputs: Optional[np.ndarray] = None):
+        """Per-feature contributions for ``outputs`` (default: all) of every row.
+
+        Returns ``(bias, contrib)`` with ``bias`` shaped (outputs,) and ``contrib``
+        shaped (rows x features x outputs). Cost is one path walk plus a gather of
+        ``delta`` rows, so it stays close to a single ``predict``.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'X has {X.shape[-1]} features, but the forest expects {self.n_features_in_}')
+        outputs = np.arange(self.value.shape[1]) if outputs is None else np.asarray(outputs, dtype=np.int64)
+        n_rows, n_cols = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int64) * n_cols)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        contrib = np.zeros((n_rows, n_cols, outputs.shape[0]), dtype=np.float64)
+        for _ in range(self.max_depth):
+            split = np.take(self.feature, nodes)
+            go_right = np.take(flat, row_base + split) > np.take(self.threshold, nodes)
+            nxt = np.take(self.children, nodes * 2 + go_right)
+            rows, trees = np.nonzero(nxt != nodes)
+            if rows.size == 0:
+                break
+            # Credit the value change of each step to the feature the parent split on
+            np.add.at(contrib, (rows, split[rows, trees]), self.delta[nxt[rows, trees]][:, outputs])
+            nodes = nxt
+        contrib /= self.n_trees
+        return np.asarray(self.bias, dtype=np.float64)[outputs], contrib
+
+    def save(self, directory: str) -> str:
+        """Write the arrays as uncompressed .npy files plus meta.json into ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAY_NAMES + _ATTRIBUTION_NAMES:
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        meta = {
+            **self.meta,
+            'format_version': COMPILED_FORMAT_VERSION,
+            'labels': self.labels,
+            'n_features': self.n_features_in_,
+            'max_depth': self.max_depth,
+            'n_trees': self.n_trees,
+            'n_nodes': self.n_nodes,
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as fh:
+            json.dump(meta, fh)
+        return directory
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = None) -> 'CompiledForest':
+        """Load a saved forest. With ``mmap_mode='r'`` the arrays are read-only file
+        mappings, so every process on the host shares the same page-cache pages."""
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as fh:
+            meta = json.load(fh)
+        if meta.get('format_version') != COMPILED_FORMAT_VERSION:
+            raise ValueError(f'Unsupported compiled forest format {meta.get("format_version")!r}')
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in _ARRAY_NAMES}
+        missing = [name for name in _ATTRIBUTION_NAMES if not os.path.exists(os.path.join(directory, f'{name}.npy'))]
+        if missing:
+            # Artifacts compiled before attribution tables existed: derive them once and
+            # write them back, so later loads (and other processes) map the shared copy
+            derived = dict(zip(_ATTRIBUTION_NAMES, attribution_tables(arrays['children'], arrays['value'], arrays['roots'])))
+            for name in missing:
+                try:
+                    _save_array(directory, name, derived[name])
+                except OSError as e:
+                    print(f"[COMPILED-FOREST] Could not write {name}.npy to {directory}: {e}")
+                    arrays[name] = derived[name]
+        for name in _ATTRIBUTION_NAMES:
+            if name not in arrays:
+                arrays[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+        return cls(labels=meta['labels'], n_features=meta['n_features'], max_depth=meta['max_depth'],
+                   meta={**meta, 'mmap_mode': mmap_mode}, **arrays)
+
+    @property
+    def is_mapped(self) -> bool:
+        return any(isinstance(getattr(self, name), np.memmap) for name in _ARRAY_NAMES + _ATTRIBUTION_NAMES)
+
+    def prefault(self) -> int:
+        """Pull mapped arrays into the page cache ahead of the first request.
+
+        Returns the number of bytes touched. Pages stay shared between processes
+        because the mapping is file-backed and never written.
+        """
+        touched = 0
+        for name in _ARRAY_NAMES + _ATTRIBUTION_NAMES:
+            arr = getattr(self, name)
+            mm = getattr(arr, '_mmap', None)
+            if mm is not None and hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_WILLNEED'):
+                try:
+                    mm.madvise(mmap.MADV_WILLNEED)
+                except OSError:
+                    pass
+            # Read one byte per page so the mapping is resident even without madvise
+            flat = arr.reshape(-1).view(np.uint8)
+            page = mmap.PAGESIZE
+            if flat.size:
+                int(flat[::page].sum())
+            touched += int(arr.nbytes)
+        return touched
+
+
+def _save_array(directory: str, name: str, arr: np.ndarray) -> None:
+    """Write ``<name>.npy`` via a temporary file and rename, so readers never see a partial array."""
+    fd, tmp_path = tempfile.mkstemp(prefix=f'{name}.', suffix='.npy.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            np.save(fh, np.ascontiguousarray(arr))
+        os.replace(tmp_path, os.path.join(directory, f'{name}.npy'))
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def attribution_tables(children: np.ndarray, value: np.ndarray, roots: np.ndarray):
+    """Derive (delta, bias): node value minus parent value, and the mean root value."""
+    pairs = np.asarray(children).reshape(-1, 2)
+    ids = np.arange(pairs.shape[0], dtype=np.int32)
+    parent = ids.copy()
+    for side in (0, 1):
+        child = pairs[:, side]
+        internal = child != ids
+        parent[child[internal]] = ids[internal]
+    delta = (np.asarray(value, dtype=np.float32) - np.asarray(value, dtype=np.float32)[parent])
+    bias = np.asarray(value, dtype=np.float64)[np.asarray(roots)].mean(axis=0).astype(np.float32)
+    return np.ascontiguousarray(delta, dtype=np.float32), bias
+
+
+def compile_forest(bundle: Dict[str, Any]) -> CompiledForest:
+    """Flatten a trained ``{'model', 'labels'}`` bundle into a CompiledForest."""
+    model = bundle.get('model')
+    labels = bundle.get('labels') or []
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators:
+        raise ValueError('Model bundle does not contain a fitted tree ensemble')
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in estimators:
+        tree = est.tree_
+        n = tree.node_count
+        ids = np.arange(n, dtype=np.int32) + offset
+        is_leaf = tree.children_left < 0
+        # Leaves loop back to themselves so every row can take max_depth steps
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float32))
+        left = np.where(is_leaf, ids, tree.children_left + offset)
+        right = np.where(is_leaf, ids, tree.children_right + offset)
+        children.append(np.stack([left, right], axis=1).astype(np.int32).ravel())
+        values.append(tree.value[:, :, 0].astype(np.float32))
+        roots.append(offset)
+        max_depth = max(max_depth, int(tree.max_depth))
+        offset += n
+
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        children=np.concatenate(children),
+        value=np.ascontiguousarray(np.concatenate(values)),
+        roots=np.asarray(roots, dtype=np.int32),
+        labels=labels,
+        n_features=int(getattr(model, 'n_features_in_', 0)),
+        max_depth=max_depth,
+    )
+
+
+def compiled_dir_for(model_path: str, signature) -> str:
+    """Versioned directory that holds the compiled form of ``model_path`` at ``signature``."""
+    base, _ = os.path.splitext(os.path.abspath(model_path))
+    return f'{base}.forest-{signature[0]}-{signature[1]}'
+
+
+def publish_compiled(forest: CompiledForest, model_path: str, signature) -> str:
+    """Save a compiled forest into its versioned directory and remove older versions.
+
+    The arrays are written to a temporary directory first and renamed into place,
+    so concurrent readers never observe a partial compiled artifact.
+    """
+    target = compiled_dir_for(model_path, signature)
+    if os.path.isdir(target):
+        return target
+    parent = os.path.dirname(target)
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(target) + '.', suffix='.tmp', dir=parent)
+    try:
+        forest.meta['source_signature'] = list(signature)
+        forest.save(tmp_dir)
+        os.replace(tmp_dir, target)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(target):
+            raise
+    prefix = os.path.basename(os.path.splitext(os.path.abspath(model_path))[0]) + '.forest-'
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if name.startswith(prefix) and path != target and not name.endswith('.tmp') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return target
@@ -0,0 +1,103 @@
+"""
+In-process cache of career forecast results.
+
+Entries are keyed by a fingerprint of (program, model artifact version,
+normalized grade vector), so a retrained model never serves stale results.
+Eviction is LRU with a per-entry TTL.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def grades_fingerprint(program: str, model_version: str, grades: List[float]) -> str:
+    """Stable hash of the inputs that determine a forecast."""
+    normalized = ','.join(f'{float(g):.2f}' for g in grades)
+    raw = f'{program}|{model_version}|{normalized}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class ForecastCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = OrderedDict()  # key -> (stored_at, value), least recently used first
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'db_writes_skipped': 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self._stats['misses'] += 1
+                return None
+            stored_at, value = item
+            if self.ttl_seconds > 0 and now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def record_skipped_write(self) -> None:
+        with self._lock:
+            self._stats['db_writes_skipped'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+
+_cache: Optional[ForecastCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_forecast_cache() -> ForecastCache:
+    """Return the process-wide forecast cache (created on first use)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ForecastCache(
+                    max_entries=int(os.getenv('FORECAST_CACHE_MAX_ENTRIES', '10000')),
+                    ttl_seconds=float(os.getenv('FORECAST_CACHE_TTL_SECONDS', '3600')),
+                )
+    return _cache
+
+
+def forecast_unchanged(stored_row: Dict[str, Any], labels: List[str], scores: List[float]) -> bool:
+    """True when the user's stored top jobs/scores already equal the new result."""
+    stored_labels = stored_row.get('career_top_jobs') or []
+    stored_scores = stored_row.get('career_top_jobs_scores') or []
+    if list(stored_labels) != list(labels) or len(stored_scores) != len(scores):
+        return False
+    try:
+        return all(abs(float(a) - float(b)) < 1e-6 for a, b in zip(stored_scores, scores))
+    except Exception:
+        return False
@@ -0,0 +1,159 @@
+"""
+Training data source that reads the normalized ``user_grades`` table.
+
+Rows are streamed through a psycopg2 server-side (named) cursor ordered by
+user, pivoted into one feature vector per user (columns = course codes) a chunk
+of users at a time, and appended to a SampleStore. Targets come from the
+user's stored ``career_top_jobs``/``career_top_jobs_scores``; users without a
+stored forecast are skipped.
+"""
+
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.sample_store import SampleStore
+
+try:
+    import resource  # type: ignore
+except ImportError:  # pragma: no cover - Windows dev machines
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    # ru_maxrss is KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+
+def _clip_grade(value) -> float:
+    try:
+        return min(4.0, max(0.0, float(value)))
+    except Exception:
+        return 0.0
+
+
+def ingest_user_grades(store: SampleStore, database_url: str, course_codes: Optional[List[str]] = None,
+                       chunk_users: int = 1000, itersize: int = 5000, job=None) -> Dict[str, Any]:
+    """Stream ``user_grades`` into ``store``; returns throughput and memory figures.
+
+    Only one chunk of ``chunk_users`` pivoted users is held in Python at once;
+    the cursor fetches ``itersize`` rows per round trip.
+    """
+    import psycopg2  # type: ignore
+
+    started = time.perf_counter()
+    labels = store.labels
+    label_index = {name: i for i, name in enumerate(labels)}
+    rows_scanned = 0
+    users_seen = 0
+    users_written = 0
+
+    conn = psycopg2.connect(database_url)
+    try:
+        conn.autocommit = False
+        with conn.cursor() as meta_cur:
+            if not course_codes:
+                meta_cur.execute(
+                    'SELECT DISTINCT course_code FROM public.user_grades '
+                    'WHERE course_code IS NOT NULL ORDER BY course_code'
+                )
+                course_codes = [r[0] for r in meta_cur.fetchall()]
+            meta_cur.execute('SELECT count(*) FROM public.user_grades')
+            total_rows = int(meta_cur.fetchone()[0] or 0)
+        if not course_codes:
+            raise ValueError('user_grades has no course codes to use as features')
+        column = {code: i for i, code in enumerate(course_codes)}
+        n_features = len(course_codes)
+        matched = np.zeros(n_features, dtype=bool)
+
+        pending_ids: List[int] = []
+        pending_X: List[np.ndarray] = []
+
+        def flush() -> int:
+            if not pending_ids:
+                return 0
+            with conn.cursor() as label_cur:
+                label_cur.execute(
+                    'SELECT id, career_top_jobs, career_top_jobs_scores FROM public.users WHERE id = ANY(%s)',
+                    (pending_ids,),
+                )
+                targets = {}
+                for user_id, jobs, scores in label_cur.fetchall():
+                    if not jobs or not scores or len(jobs) != len(scores):
+                        continue
+                    y = np.zeros(len(labels), dtype=np.float32)
+                    for name, score in zip(jobs, scores):
+                        idx = label_index.get(name)
+                        if idx is not None:
+                            y[idx] = min(1.0, max(0.0, float(score)))
+                    targets[user_id] = y
+            keep = [i for i, uid in enumerate(pending_ids) if uid in targets]
+            if keep:
+                store.append(np.stack([pending_X[i] for i in keep]),
+                             np.stack([targets[pending_ids[i]] for i in keep]))
+            pending_ids.clear()
+            pending_X.clear()
+            return len(keep)
+
+        # Named cursor => rows stay on the server and arrive itersize at a time
+        cur = conn.cursor(name=f'user_grades_{uuid.uuid4().hex[:8]}')
+        cur.itersize = max(100, int(itersize))
+        cur.execute(
+            'SELECT user_id, course_code, grade FROM public.user_grades '
+            'WHERE course_code IS NOT NULL ORDER BY user_id, updated_at'
+        )
+        current_user = None
+        vector = None
+        for user_id, course_code, grade in cur:
+            rows_scanned += 1
+            if user_id != current_user:
+                if vector is not None:
+                    pending_ids.append(current_user)
+                    pending_X.append(vector)
+                    users_seen += 1
+                    if len(pending_ids) >= chunk_users:
+                        users_written += flush()
+                        if job is not None:
+                            job.check_cancelled()
+                            job.set_progress(0.5 * rows_scanned / max(1, total_rows),
+                                             f'{rows_scanned}/{total_rows} grade rows read')
+                current_user = user_id
+                vector = np.zeros(n_features, dtype=np.float32)
+            idx = column.get(course_code)
+            if idx is not None:
+                # Later rows (newer updated_at) win for retaken courses
+                vector[idx] = _clip_grade(grade)
+                matched[idx] = True
+        if vector is not None:
+            pending_ids.append(current_user)
+            pending_X.append(vector)
+            users_seen += 1
+        users_written += flush()
+        cur.close()
+        conn.commit()
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows_scanned': rows_scanned,
+        'users_seen': users_seen,
+        'users_written': users_written,
+        'feature_len': n_features,
+        'course_codes': list(course_codes),
+        'codes_matched': int(matched.sum()),
+        'codes_unmatched': [code for code, hit in zip(course_codes, matched) if not hit],
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(rows_scanned / elapsed, 1) if elapsed > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def database_url() -> Optional[str]:
+    return os.getenv('DATABASE_URL')
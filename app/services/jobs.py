@@ -0,0 +1,166 @@
+"""
+Background job runner for long-running work (model training, bulk re-scoring).
+
+Jobs run on a small process-level thread pool so request threads only submit
+work and return a job id. Job functions receive their ``Job`` handle to report
+progress and to check for cooperative cancellation between steps. An optional
+``cleanup`` callable runs once when the job finishes, including when it is
+cancelled before it ever starts.
+"""
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when cancellation was requested."""
+
+
+class Job:
+    def __init__(self, kind: str, params: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = ''
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._future = None
+        self._cleanup: Optional[Callable[[], None]] = None
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def set_progress(self, progress: float, message: str = '') -> None:
+        self.progress = max(0.0, min(1.0, float(progress)))
+        if message:
+            self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'message': self.message,
+            'params': self.params,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobManager:
+    """Tracks submitted jobs and runs them on a bounded executor."""
+
+    def __init__(self, max_workers: int = 1, max_history: int = 100):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix='gradalyze-job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.max_history = max_history
+
+    def submit(self, kind: str, fn: Callable[[Job], Optional[Dict[str, Any]]], params: Optional[Dict[str, Any]] = None,
+               cleanup: Optional[Callable[[], None]] = None) -> Job:
+        job = Job(kind, params)
+        job._cleanup = cleanup
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job._future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Optional[Dict[str, Any]]]) -> None:
+        if job.cancel_requested:
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+            self._release(job)
+            return
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = fn(job)
+            job.status = 'succeeded'
+            job.progress = 1.0
+        except JobCancelled:
+            job.status = 'cancelled'
+            job.message = job.message or 'Cancelled'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            print(f"[JOBS] {job.kind} job {job.id} failed: {e}\n{traceback.format_exc()}")
+        finally:
+            job.finished_at = time.time()
+            self._release(job)
+
+    def _release(self, job: Job) -> None:
+        with self._lock:
+            cleanup, job._cleanup = job._cleanup, None
+        if cleanup is None:
+            return
+        try:
+            cleanup()
+        except Exception as e:
+            print(f"[JOBS] {job.kind} job {job.id} cleanup failed: {e}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if kind:
+            jobs = [j for j in jobs if j.kind == kind]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; queued jobs never start, running jobs stop at their next checkpoint."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.status in ('queued', 'running'):
+            job._cancel.set()
+            if job._future is not None and job._future.cancel():
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+                self._release(job)
+        return job
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in ('succeeded', 'failed', 'cancelled')]
+        excess = len(self._jobs) - self.max_history
+        if excess <= 0:
+            return
+        for job in sorted(finished, key=lambda j: j.created_at)[:excess]:
+            self._jobs.pop(job.id, None)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager (created on first use)."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager(max_workers=int(os.getenv('BACKGROUND_JOB_WORKERS', '1')))
+    return _manager
@@ -0,0 +1,271 @@
+"""
+Process-wide registry for career model bundles.
+
+Each program (IT, CS, ...) registers the path of its joblib bundle once. The
+registry deserializes a bundle on first use and keeps it in a bounded LRU so
+every request after that reuses the same in-memory model. The artifact's
+mtime/size is re-checked on access so a retrained file is picked up without a
+restart.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from joblib import dump, load
+
+
+class ModelRegistry:
+    """Thread-safe LRU of loaded model bundles keyed by program."""
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max(1, int(max_entries))
+        self._paths: Dict[str, str] = {}
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'reloads': 0,
+            'evictions': 0,
+            'load_errors': 0,
+            'load_seconds_total': 0.0,
+            'last_load_seconds': 0.0,
+        }
+
+    def register(self, program: str, path: str) -> None:
+        """Associate a program key with the artifact path that serves it."""
+        with self._lock:
+            self._paths[program] = os.path.abspath(path)
+
+    def path_for(self, program: str) -> Optional[str]:
+        return self._paths.get(program)
+
+    def version(self, program: str) -> Optional[str]:
+        """Opaque artifact version ('<mtime_ns>-<size>') for cache keys, or None if missing."""
+        path = self._paths.get(program)
+        signature = self._signature(path) if path else None
+        return f'{signature[0]}-{signature[1]}' if signature else None
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, program: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return (bundle, error) for a program, loading or reloading as needed."""
+        path = self._paths.get(program)
+        if not path:
+            return None, f'No model registered for program {program!r}'
+        signature = self._signature(path)
+        if signature is None:
+            return None, f'Model file not found at {path}'
+        return self._lookup(program, signature, lambda: self._load_bundle(path))
+
+    def get_inference_bundle(self, program: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return the bundle used for serving: the compiled forest unless
+        CAREER_INFERENCE_ENGINE=sklearn. Its ``model`` exposes predict()/n_features_in_."""
+        if inference_engine() != 'compiled':
+            return self.get(program)
+        return self.get_compiled(program)
+
+    def get_compiled(self, program: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return the compiled-forest bundle regardless of the serving engine
+        (attribution tables only exist in the compiled form)."""
+        path = self._paths.get(program)
+        if not path:
+            return None, f'No model registered for program {program!r}'
+        signature = self._signature(path)
+        if signature is None:
+            return None, f'Model file not found at {path}'
+        return self._lookup(f'{program}:compiled', signature, lambda: self._load_compiled(program, path, signature))
+
+    def _lookup(self, key: str, signature: Tuple[int, int], loader) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['signature'] == signature:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry['bundle'], None
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Serialize loads per key so concurrent misses deserialize once
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry['signature'] == signature:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry['bundle'], None
+                self._stats['misses'] += 1
+                if entry is not None:
+                    self._stats['reloads'] += 1
+
+            started = time.perf_counter()
+            bundle, error = loader()
+            elapsed = time.perf_counter() - started
+            if bundle is None:
+                with self._lock:
+                    self._stats['load_errors'] += 1
+                return None, error
+
+            with self._lock:
+                self._stats['load_seconds_total'] += elapsed
+                self._stats['last_load_seconds'] = elapsed
+                self._entries[key] = {
+                    'bundle': bundle,
+                    'signature': signature,
+                    'loaded_at': time.time(),
+                    'load_seconds': elapsed,
+                }
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+            print(f"[MODEL-REGISTRY] Loaded {key} model in {elapsed * 1000:.1f} ms")
+            return bundle, None
+
+    @staticmethod
+    def _load_bundle(path: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        try:
+            bundle = load(path)
+        except Exception as e:
+            return None, f'Failed to load model from {path}: {e}'
+        if not isinstance(bundle, dict) or bundle.get('model') is None or not bundle.get('labels'):
+            return None, 'Model bundle missing required keys {model, labels}'
+        return bundle, None
+
+    def _load_compiled(self, program: str, path: str, signature: Tuple[int, int]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        from app.services.compiled_forest import CompiledForest, compile_forest, compiled_dir_for, publish_compiled
+
+        target = compiled_dir_for(path, signature)
+        forest = None
+        if os.path.isdir(target):
+            try:
+                forest = CompiledForest.load(target, mmap_mode=model_mmap_mode())
+            except Exception as e:
+                print(f"[MODEL-REGISTRY] Ignoring unreadable compiled forest at {target}: {e}")
+        if forest is None:
+            bundle, error = self._load_bundle(path)
+            if bundle is None:
+                return None, error
+            try:
+                forest = compile_forest(bundle)
+            except Exception as e:
+                return None, f'Failed to compile model from {path}: {e}'
+            try:
+                published = publish_compiled(forest, path, signature)
+                if model_mmap_mode():
+                    # Serve from the file mapping rather than this process's private copy
+                    forest = CompiledForest.load(published, mmap_mode=model_mmap_mode())
+            except Exception as e:
+                print(f"[MODEL-REGISTRY] Could not persist compiled forest for {program}: {e}")
+        # The sklearn object is not needed for serving once compiled
+        with self._lock:
+            self._entries.pop(program, None)
+        return {'model': forest, 'labels': forest.labels, 'compiled': True}, None
+
+    def premap(self) -> Dict[str, Any]:
+        """Load every registered program's serving artifact and fault its pages in.
+
+        Call before worker processes fork (e.g. gunicorn --preload) so children
+        inherit the mappings and share one page-cache copy of each forest.
+        """
+        report: Dict[str, Any] = {}
+        for program in list(self._paths):
+            bundle, error = self.get_inference_bundle(program)
+            if bundle is None:
+                report[program] = {'error': error}
+                continue
+            model = bundle.get('model')
+            touched = model.prefault() if hasattr(model, 'prefault') else 0
+            report[program] = {
+                'mapped': bool(getattr(model, 'is_mapped', False)),
+                'bytes': touched,
+            }
+        return report
+
+    def invalidate(self, program: Optional[str] = None) -> None:
+        """Drop one cached bundle (or all) so the next access reloads from disk."""
+        with self._lock:
+            if program is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(program, None)
+                self._entries.pop(f'{program}:compiled', None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'max_entries': self.max_entries,
+                'registered': dict(self._paths),
+                'loaded': {
+                    program: {
+                        'mtime_ns': entry['signature'][0],
+                        'size_bytes': entry['signature'][1],
+                        'loaded_at': entry['loaded_at'],
+                        'load_seconds': round(entry['load_seconds'], 4),
+                    }
+                    for program, entry in self._entries.items()
+                },
+            }
+
+
+def inference_engine() -> str:
+    """Serving backend for career models: 'compiled' (default) or 'sklearn'."""
+    engine = (os.getenv('CAREER_INFERENCE_ENGINE') or 'compiled').strip().lower()
+    return engine if engine in ('compiled', 'sklearn') else 'compiled'
+
+
+def model_mmap_mode() -> Optional[str]:
+    """'r' when compiled artifacts should be memory-mapped (MODEL_MMAP, default on)."""
+    return 'r' if os.getenv('MODEL_MMAP', 'true').lower() == 'true' else None
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide model registry (created on first use)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(max_entries=int(os.getenv('MODEL_REGISTRY_MAX_ENTRIES', '4')))
+    return _registry
+
+
+def publish_bundle(bundle: Dict[str, Any], path: str) -> str:
+    """Write a model bundle next to its final path, then atomically swap it in.
+
+    Readers either see the previous artifact or the complete new one, never a
+    partially written file. Returns the absolute path that was published.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            dump(bundle, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return path
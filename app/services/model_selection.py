@@ -0,0 +1,274 @@
+"""
+Latency-aware model selection for the career forest.
+
+Sweeps ``n_estimators`` x ``max_depth`` with parallel k-fold cross-validation,
+measures serving cost (p50/p99 single-row and batch latency on the compiled
+engine, artifact size) and top-6 agreement, and writes a Pareto report.
+``--promote`` saves the chosen forest size next to the artifact (picked up by
+every training path via load_hyperparams). With ``--source store`` it also
+publishes a model trained with it; a synthetic sweep never replaces the live
+artifact, so the size takes effect at the next real training run.
+
+Run from the backend root:
+    python -m app.services.model_selection --program cs --source store
+    python -m app.services.model_selection --program it --source synthetic --promote auto
+"""
+
+import argparse
+import io
+import json
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import KFold
+
+from app.services.career_training import fit_forest, publish_career_model, save_hyperparams, training_cpu_budget
+from app.services.compiled_forest import compile_forest
+
+DEFAULT_ESTIMATORS = (40, 80, 120, 180)
+DEFAULT_DEPTHS = (10, 14, 18, 22)
+
+
+def synthetic_dataset(n_samples: int, n_features: int, n_labels: int, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """Same generator shape as the CS bootstrap: each job tracks a window of courses."""
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0.0, 4.0, size=(n_samples, n_features))
+    Y = np.zeros((n_samples, n_labels))
+    for j in range(n_labels):
+        start = (j * 3) % max(1, n_features - 8)
+        end = min(n_features, start + 12)
+        weights = np.linspace(0.6, 1.8, end - start)
+        Y[:, j] = np.tanh((X[:, start:end] * weights).mean(axis=1) / 3.0) + rng.normal(0, 0.05, size=n_samples)
+    return X, Y
+
+
+def top6_agreement(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    """Mean fraction of the true top-6 careers that the prediction also ranks top-6."""
+    k = min(6, y_true.shape[1])
+    true_top = np.argpartition(-y_true, k - 1, axis=1)[:, :k]
+    pred_top = np.argpartition(-y_pred, k - 1, axis=1)[:, :k]
+    hits = (true_top[:, :, None] == pred_top[:, None, :]).any(axis=2).sum(axis=1)
+    return float(np.mean(hits / k))
+
+
+def _cv_fold(X, Y, train_idx, val_idx, n_estimators: int, max_depth: Optional[int]) -> Dict[str, float]:
+    model = RandomForestRegressor(random_state=42, n_estimators=n_estimators, max_depth=max_depth, n_jobs=1)
+    model.fit(X[train_idx], Y[train_idx])
+    pred = model.predict(X[val_idx])
+    return {
+        'top6_agreement': top6_agreement(Y[val_idx], pred),
+        'mae': float(np.mean(np.abs(pred - Y[val_idx]))),
+    }
+
+
+def _percentiles_ms(fn, repeats: int) -> Tuple[float, float]:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+def _serving_profile(X, Y, n_estimators: int, max_depth: Optional[int], repeats: int, batch_size: int) -> Dict[str, Any]:
+    model = fit_forest(X, Y, n_estimators=n_estimators, max_depth=max_depth, random_state=42)
+    forest = compile_forest({'model': model, 'labels': [str(i) for i in range(Y.shape[1])]})
+    buf = io.BytesIO()
+    pickle.dump(model, buf, protocol=pickle.HIGHEST_PROTOCOL)
+    rng = np.random.default_rng(7)
+    rows = X[rng.integers(0, X.shape[0], size=batch_size)]
+    single = rows[:1]
+    forest.predict(single)  # warm-up
+    p50_single, p99_single = _percentiles_ms(lambda: forest.predict(single), repeats)
+    p50_batch, p99_batch = _percentiles_ms(lambda: forest.predict(rows), max(3, repeats // 10))
+    return {
+        'latency_single_p50_ms': round(p50_single, 3),
+        'latency_single_p99_ms': round(p99_single, 3),
+        'latency_batch_p50_ms': round(p50_batch, 3),
+        'latency_batch_p99_ms': round(p99_batch, 3),
+        'batch_size': batch_size,
+        'compiled_bytes': forest.nbytes,
+        'pickle_bytes': buf.getbuffer().nbytes,
+        'n_nodes': forest.n_nodes,
+    }
+
+
+def pareto_front(results: List[Dict[str, Any]]) -> List[int]:
+    """Indices of configurations not dominated on (p99 single latency, size, agreement)."""
+    front = []
+    for i, a in enumerate(results):
+        dominated = False
+        for j, b in enumerate(results):
+            if i == j:
+                continue
+            no_worse = (b['latency_single_p99_ms'] <= a['latency_single_p99_ms']
+                        and b['compiled_bytes'] <= a['compiled_bytes']
+                        and b['top6_agreement'] >= a['top6_agreement'])
+            better = (b['latency_single_p99_ms'] < a['latency_single_p99_ms']
+                      or b['compiled_bytes'] < a['compiled_bytes']
+                      or b['top6_agreement'] > a['top6_agreement'])
+            if no_worse and better:
+                dominated = True
+                break
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def sweep(X: np.ndarray, Y: np.ndarray, estimators=DEFAULT_ESTIMATORS, depths=DEFAULT_DEPTHS, folds: int = 3,
+          repeats: int = 50, batch_size: int = 256, n_jobs: Optional[int] = None) -> Dict[str, Any]:
+    configs = [(int(n), (int(d) if d else None)) for n in estimators for d in depths]
+    splits = list(KFold(n_splits=folds, shuffle=True, random_state=42).split(X))
+    n_jobs = n_jobs or training_cpu_budget()
+
+    fold_scores = Parallel(n_jobs=n_jobs)(
+        delayed(_cv_fold)(X, Y, tr, va, n, d) for (n, d) in configs for (tr, va) in splits
+    )
+
+    results = []
+    for c, (n, d) in enumerate(configs):
+        scores = fold_scores[c * folds:(c + 1) * folds]
+        entry = {
+            'n_estimators': n,
+            'max_depth': d,
+            'top6_agreement': round(float(np.mean([s['top6_agreement'] for s in scores])), 4),
+            'top6_agreement_std': round(float(np.std([s['top6_agreement'] for s in scores])), 4),
+            'mae': round(float(np.mean([s['mae'] for s in scores])), 5),
+        }
+        # Latency is measured serially so runs do not contend for cores
+        entry.update(_serving_profile(X, Y, n, d, repeats, batch_size))
+        results.append(entry)
+        print(f"[MODEL-SELECTION] n_estimators={n} max_depth={d}: agreement={entry['top6_agreement']:.3f} "
+              f"p99={entry['latency_single_p99_ms']:.2f} ms size={entry['compiled_bytes'] / 1e6:.1f} MB")
+
+    front = pareto_front(results)
+    for i, entry in enumerate(results):
+        entry['pareto'] = i in front
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'samples': int(X.shape[0]),
+        'features': int(X.shape[1]),
+        'labels': int(Y.shape[1]),
+        'folds': folds,
+        'results': results,
+        'pareto_front': [results[i] for i in front],
+    }
+
+
+def choose(report: Dict[str, Any], spec: str, tolerance: float = 0.01) -> Optional[Dict[str, Any]]:
+    """Pick a configuration: 'auto' = fastest Pareto point within ``tolerance`` of the best
+    agreement; otherwise an explicit '<n_estimators>x<max_depth>'."""
+    results = report['results']
+    if spec == 'auto':
+        best = max(r['top6_agreement'] for r in results)
+        eligible = [r for r in report['pareto_front'] if r['top6_agreement'] >= best - tolerance]
+        return min(eligible, key=lambda r: (r['latency_single_p99_ms'], r['compiled_bytes'])) if eligible else None
+    try:
+        n_str, d_str = spec.lower().split('x', 1)
+        n, d = int(n_str), (int(d_str) if d_str not in ('', 'none') else None)
+    except ValueError:
+        return None
+    return next((r for r in results if r['n_estimators'] == n and r['max_depth'] == d), None)
+
+
+def write_report(report: Dict[str, Any], directory: str, program: str) -> Tuple[str, str]:
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    json_path = os.path.join(directory, f'model_selection-{program}-{stamp}.json')
+    md_path = os.path.join(directory, f'model_selection-{program}-{stamp}.md')
+    with open(json_path, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2)
+    lines = [
+        f"# Career model selection ({program})",
+        '',
+        f"{report['samples']} samples, {report['features']} features, {report['labels']} labels, {report['folds']}-fold CV",
+        '',
+        '| trees | depth | top-6 agreement | MAE | p50 1-row ms | p99 1-row ms | p50 batch ms | p99 batch ms | compiled MB | Pareto |',
+        '|---|---|---|---|---|---|---|---|---|---|',
+    ]
+    for r in sorted(report['results'], key=lambda r: (r['latency_single_p99_ms'])):
+        lines.append(
+            f"| {r['n_estimators']} | {r['max_depth']} | {r['top6_agreement']:.4f} | {r['mae']:.5f} | "
+            f"{r['latency_single_p50_ms']:.2f} | {r['latency_single_p99_ms']:.2f} | {r['latency_batch_p50_ms']:.2f} | "
+            f"{r['latency_batch_p99_ms']:.2f} | {r['compiled_bytes'] / 1e6:.1f} | {'yes' if r['pareto'] else ''} |"
+        )
+    if report.get('promoted'):
+        p = report['promoted']
+        lines += ['', f"Promoted: n_estimators={p['n_estimators']}, max_depth={p['max_depth']}"]
+    with open(md_path, 'w', encoding='utf-8') as fh:
+        fh.write('\n'.join(lines) + '\n')
+    return json_path, md_path
+
+
+def _load_data(program: str, source: str, samples: int) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    from app.routes.objective_1 import JOBS_MASTER
+
+    if source == 'store':
+        from app.routes.objective_1_cs import get_sample_store
+        if program != 'cs':
+            raise SystemExit('--source store is only available for the cs program')
+        # Copy the rows out under a lease so a concurrent clear cannot pull them away
+        with get_sample_store().lease() as lease:
+            if lease.X.shape[0] == 0:
+                raise SystemExit('CS sample store is empty; upload samples first')
+            return np.array(lease.X), np.array(lease.Y), list(JOBS_MASTER)
+    n_features = 53 if program == 'cs' else 66
+    X, Y = synthetic_dataset(samples, n_features, len(JOBS_MASTER))
+    return X, Y, list(JOBS_MASTER)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--program', default='cs', choices=['it', 'cs'])
+    parser.add_argument('--source', default='synthetic', choices=['synthetic', 'store'])
+    parser.add_argument('--samples', type=int, default=1600, help='rows for --source synthetic')
+    parser.add_argument('--estimators', default=','.join(map(str, DEFAULT_ESTIMATORS)))
+    parser.add_argument('--depths', default=','.join(map(str, DEFAULT_DEPTHS)))
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--report-dir', default=os.path.join(os.path.dirname(__file__), '..', '..', 'models', 'reports'))
+    parser.add_argument('--promote', default=None, help="'auto' or '<n_estimators>x<max_depth>'")
+    parser.add_argument('--tolerance', type=float, default=0.01, help='agreement slack for --promote auto')
+    args = parser.parse_args(argv)
+
+    # Route modules register program -> artifact paths with the model registry
+    from app.routes import objective_1, objective_1_cs  # noqa: F401
+    from app.services.model_registry import get_model_registry
+
+    X, Y, labels = _load_data(args.program, args.source, args.samples)
+    report = sweep(
+        X, Y,
+        estimators=[int(x) for x in args.estimators.split(',') if x],
+        depths=[int(x) if x.lower() != 'none' else None for x in args.depths.split(',') if x],
+        folds=args.folds, repeats=args.repeats, batch_size=args.batch_size,
+    )
+
+    if args.promote:
+        chosen = choose(report, args.promote, args.tolerance)
+        if chosen is None:
+            raise SystemExit(f'No configuration matches --promote {args.promote}')
+        model_path = get_model_registry().path_for(args.program)
+        params = {'n_estimators': chosen['n_estimators'], 'max_depth': chosen['max_depth']}
+        save_hyperparams(model_path, {**params, 'promoted_at': datetime.now(timezone.utc).isoformat()})
+        if args.source == 'store':
+            model = fit_forest(X, Y, random_state=42, **params)
+            report['promoted'] = {**params, **publish_career_model(args.program, model, labels, model_path)}
+            print(f"[MODEL-SELECTION] Promoted {params} to {model_path}")
+        else:
+            # Synthetic rows must never replace a model trained on student data
+            report['promoted'] = {**params, 'published': False}
+            print(f"[MODEL-SELECTION] Saved {params} for {model_path}; not publishing a model trained on synthetic data")
+
+    json_path, md_path = write_report(report, os.path.abspath(args.report_dir), args.program)
+    print(f"[MODEL-SELECTION] Report written to {md_path} and {json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Process-level pool of warmed EasyOCR readers.
+
+Constructing ``easyocr.Reader`` loads the detection and recognition networks
+from disk, which costs seconds and hundreds of MB, so readers are created once
+and handed out under a lease. The pool size is also the limit on concurrent OCR
+in this process: a caller that cannot get a reader within the acquire timeout
+gets ``OcrPoolBusy`` instead of queueing forever.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+class OcrPoolBusy(Exception):
+    """No reader became free within the acquire timeout."""
+
+
+def _easyocr_reader(languages: Sequence[str], gpu: bool) -> Any:
+    import easyocr
+    return easyocr.Reader(list(languages), gpu=gpu)
+
+
+class OcrReaderPool:
+    def __init__(self, size: int = 1, languages: Sequence[str] = ('en',), gpu: bool = True,
+                 acquire_timeout: float = 120.0, reader_factory: Optional[Callable[[], Any]] = None):
+        self.size = max(1, int(size))
+        self.languages = tuple(languages)
+        self.gpu = bool(gpu)
+        self.acquire_timeout = float(acquire_timeout)
+        self._factory = reader_factory or (lambda: _easyocr_reader(self.languages, self.gpu))
+        self._idle: List[Any] = []
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._started = time.monotonic()
+        self._stats = {
+            'leases': 0, 'timeouts': 0, 'load_failures': 0, 'peak_in_use': 0,
+            'load_seconds': 0.0, 'last_load_seconds': None,
+            'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'busy_seconds': 0.0,
+        }
+
+    def _load(self) -> Any:
+        started = time.perf_counter()
+        reader = self._factory()
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self._stats['load_seconds'] += elapsed
+            self._stats['last_load_seconds'] = round(elapsed, 3)
+        print(f"[OCR_POOL] Loaded reader {self._created}/{self.size} in {elapsed:.2f}s")
+        return reader
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Borrow a reader for the duration of the ``with`` block (loading one if the pool is not full yet)."""
+        timeout = self.acquire_timeout if timeout is None else float(timeout)
+        started = time.monotonic()
+        deadline = started + timeout
+        load = False
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._created >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise OcrPoolBusy(f'No OCR reader free after {timeout:g}s ({self.size} in use)')
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            if self._idle:
+                reader = self._idle.pop()
+            else:
+                self._created += 1
+                load = True
+            waited = time.monotonic() - started
+            self._in_use += 1
+            self._stats['leases'] += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+
+        if load:
+            try:
+                reader = self._load()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._stats['load_failures'] += 1
+                    self._cond.notify()
+                raise
+
+        busy_from = time.monotonic()
+        try:
+            yield reader
+        finally:
+            with self._cond:
+                self._idle.append(reader)
+                self._in_use -= 1
+                self._stats['busy_seconds'] += time.monotonic() - busy_from
+                self._cond.notify()
+
+    def warm(self) -> Dict[str, Any]:
+        """Load every reader now and run each once on a blank image."""
+        blank = np.zeros((32, 32, 3), dtype=np.uint8)
+        while True:
+            with self._cond:
+                if self._created >= self.size:
+                    break
+                self._created += 1
+            try:
+                reader = self._load()
+                reader.readtext(blank)
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._stats['load_failures'] += 1
+                raise
+            with self._cond:
+                self._idle.append(reader)
+                self._cond.notify()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            uptime = time.monotonic() - self._started
+            leases = self._stats['leases']
+            return {
+                'size': self.size,
+                'languages': list(self.languages),
+                'gpu': self.gpu,
+                'readers_loaded': self._created,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'leases': leases,
+                'timeouts': self._stats['timeouts'],
+                'load_failures': self._stats['load_failures'],
+                'peak_in_use': self._stats['peak_in_use'],
+                'load_seconds': round(self._stats['load_seconds'], 3),
+                'last_load_seconds': self._stats['last_load_seconds'],
+                'avg_wait_seconds': round(self._stats['wait_seconds'] / leases, 4) if leases else 0.0,
+                'max_wait_seconds': round(self._stats['max_wait_seconds'], 4),
+                'busy_seconds': round(self._stats['busy_seconds'], 3),
+                'utilization': round(self._stats['busy_seconds'] / (uptime * self.size), 4) if uptime > 0 else 0.0,
+                'acquire_timeout_seconds': self.acquire_timeout,
+            }
+
+
+_pool: Optional[OcrReaderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> OcrReaderPool:
+    """Return the process-wide OCR reader pool (created on first use)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OcrReaderPool(
+                    size=int(os.getenv('OCR_POOL_SIZE', '1')),
+                    languages=[l.strip() for l in os.getenv('OCR_LANGUAGES', 'en').split(',') if l.strip()],
+                    gpu=os.getenv('OCR_GPU', 'true').lower() == 'true',
+                    acquire_timeout=float(os.getenv('OCR_ACQUIRE_TIMEOUT_SECONDS', '120')),
+                )
+    return _pool
@@ -0,0 +1,367 @@
+"""
+User-side inputs of objective 3 company ranking, shared by the request path and
+bulk re-ranking: the skills/RIASEC query vectors derived from a student's career
+forecast and archetype, and the fingerprint that tells whether a stored
+``job_recommendations`` payload still matches those inputs.
+
+``rerank_all_users`` recomputes every analyzed user's stored payload against the
+current catalog as a background job (queued on catalog changes when
+RERANK_ON_CATALOG_CHANGE=true, or via POST /api/objective-3/rerank).
+
+``recommendation_page`` serves the ranking beyond the stored top 20: the first
+page ranks the catalog once to RECOMMENDATION_RANK_DEPTH and caches only the
+(company id, score) arrays; later pages resume from an opaque keyset cursor
+(score, company id) and hydrate just the companies on that page. The cursor
+also names the user, so a list evicted from this worker's cache (or never held
+by it) is rebuilt from the user's current inputs.
+"""
+
+import base64
+import hashlib
+import threading
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.bulk_writes import bulk_update_users
+from app.services.company_index import (
+    DEFAULT_WEIGHTS, batch_top_k, get_company_index, normalize_filters, unit_vector,
+)
+from app.services.forecast_cache import ForecastCache
+from app.services.jobs import Job, get_job_manager
+from app.services.supabase_client import get_supabase_client
+
+# Career keyword -> [programming, data, systems, ux, management, comms]; first match wins
+SKILL_PROFILES = {
+    'software': [1.0, 0.2, 0.6, 0.1, 0.3, 0.2],
+    'data': [0.5, 1.0, 0.3, 0.1, 0.3, 0.3],
+    'systems': [0.5, 0.3, 1.0, 0.1, 0.4, 0.4],
+    'ux': [0.1, 0.2, 0.2, 1.0, 0.3, 0.4],
+    'management': [0.3, 0.2, 0.4, 0.1, 1.0, 0.8],
+    'business': [0.2, 0.2, 0.5, 0.2, 0.8, 1.0],
+}
+ARCHETYPES = ('realistic', 'investigative', 'artistic', 'social', 'enterprising', 'conventional')
+TOP_N = 20
+# users columns the recommendation inputs are read from
+USER_INPUT_COLUMNS = (
+    'career_top_jobs, career_top_jobs_scores, primary_archetype, '
+    'archetype_realistic_percentage, archetype_investigative_percentage, '
+    'archetype_artistic_percentage, archetype_social_percentage, '
+    'archetype_enterprising_percentage, archetype_conventional_percentage'
+)
+# PostgREST filter for users with at least one recommendation input
+ANALYZED_USERS_FILTER = 'primary_archetype.not.is.null,career_top_jobs.not.is.null'
+RERANK_JOB_KIND = 'rerank-recommendations'
+# Bump whenever SKILL_PROFILES, the vector derivation or the blend changes so
+# stored payloads are recomputed
+SCORING_VERSION = 1
+
+
+def user_vectors(career_forecast: Dict[str, Any], archetype_analysis: Dict[str, Any]) -> Tuple[List[float], List[float]]:
+    """(skills, riasec): forecast scores spread over SKILL_PROFILES, archetype percentages as 0..1."""
+    user_skills = [0.0] * 6
+    for career, score in (career_forecast or {}).items():
+        key = str(career).lower()
+        matched = next((fm_key for fm_key in SKILL_PROFILES if fm_key in key), None)
+        if not matched:
+            continue
+        try:
+            w = float(score)
+        except Exception:
+            w = 0.0
+        mapping = SKILL_PROFILES[matched]
+        for i in range(6):
+            user_skills[i] += w * mapping[i]
+
+    archetype_analysis = archetype_analysis or {}
+    user_riasec = [float(archetype_analysis.get(f'archetype_{name}_percentage') or 0) / 100.0 for name in ARCHETYPES]
+    return user_skills, user_riasec
+
+
+def inputs_from_user_row(user_data: Dict[str, Any]) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """(career_forecast, archetype_analysis) from the denormalized users columns."""
+    career_forecast: Dict[str, float] = {}
+    jobs = user_data.get('career_top_jobs') or []
+    scores = user_data.get('career_top_jobs_scores') or []
+    if isinstance(jobs, list) and isinstance(scores, list) and len(jobs) == len(scores):
+        try:
+            career_forecast = {str(jobs[i]): float(scores[i]) for i in range(len(jobs))}
+        except Exception:
+            career_forecast = {}
+
+    def _num(v):
+        try:
+            return float(v)
+        except Exception:
+            return None
+
+    archetype_analysis = {'primary_archetype': user_data.get('primary_archetype') or ''}
+    for name in ARCHETYPES:
+        archetype_analysis[f'archetype_{name}_percentage'] = _num(user_data.get(f'archetype_{name}_percentage'))
+    return career_forecast, archetype_analysis
+
+
+def recommendation_fingerprint(user_skills: Sequence[float], user_riasec: Sequence[float], catalog_version: str,
+                               weights: Tuple[float, float] = DEFAULT_WEIGHTS, top_n: int = TOP_N) -> str:
+    """Stable hash of everything a stored recommendation list depends on."""
+    vectors = ','.join(f'{float(x):.6f}' for x in list(user_skills) + list(user_riasec))
+    raw = f'{SCORING_VERSION}|{catalog_version}|{weights[0]:g},{weights[1]:g}|{int(top_n)}|{vectors}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def build_payload(company_recommendations: List[Dict[str, Any]], fingerprint: Optional[str],
+                  catalog_version: Optional[str]) -> Dict[str, Any]:
+    """The ``job_recommendations`` object stored on the user row."""
+    return {
+        'company_recommendations': company_recommendations,
+        'fingerprint': fingerprint,
+        'catalog_version': catalog_version,
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class _WriteThrottle:
+    """Spaces bulk writes so they average at most ``rows_per_second``."""
+
+    def __init__(self, rows_per_second: float):
+        self.rows_per_second = float(rows_per_second)
+        self._next = time.monotonic()
+
+    def wait(self, rows: int) -> None:
+        if self.rows_per_second <= 0:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+        self._next = max(now, self._next) + rows / self.rows_per_second
+
+
+def rerank_all_users(job: Optional[Job] = None, chunk_size: int = 1000, write_chunk: int = 100,
+                     writes_per_second: float = 200.0) -> Dict[str, Any]:
+    """Recompute stored job_recommendations for every analyzed user against the current catalog.
+
+    Users are read ``chunk_size`` at a time (keyset on id), turned into a
+    (users x 12) query matrix and ranked against the (companies x 12) catalog with
+    one batched top-k; results go back through ``bulk_update_users`` in
+    ``write_chunk`` rows at no more than ``writes_per_second`` rows per second.
+    """
+    index = get_company_index()
+    snap = index.snapshot()
+    if not len(snap.ids):
+        return {'users': 0, 'written': 0, 'message': 'Company catalog is empty'}
+    supabase = get_supabase_client()
+    weights = DEFAULT_WEIGHTS
+    total = None
+    try:
+        total = supabase.table('users').select('id', count='exact').or_(ANALYZED_USERS_FILTER).limit(1).execute().count
+    except Exception as e:
+        print(f"[RERANK] User count unavailable: {e}")
+
+    throttle = _WriteThrottle(writes_per_second)
+    stats = {'users': 0, 'written': 0, 'fallback_rows': 0, 'failed': 0}
+    started = time.perf_counter()
+    rank_seconds = 0.0
+    last_id = None
+    while True:
+        if job is not None:
+            job.check_cancelled()
+        q = supabase.table('users').select(f'id, email, {USER_INPUT_COLUMNS}').or_(ANALYZED_USERS_FILTER)
+        if last_id is not None:
+            q = q.gt('id', last_id)
+        users = q.order('id').limit(chunk_size).execute().data or []
+        if not users:
+            break
+        last_id = users[-1]['id']
+
+        t0 = time.perf_counter()
+        queries = np.empty((len(users), 12), dtype=np.float64)
+        fingerprints = []
+        for i, user in enumerate(users):
+            user_skills, user_riasec = user_vectors(*inputs_from_user_row(user))
+            queries[i, :6] = weights[0] * unit_vector(user_skills)
+            queries[i, 6:] = weights[1] * unit_vector(user_riasec)
+            fingerprints.append(recommendation_fingerprint(user_skills, user_riasec, snap.digest, weights))
+        top_rows, top_scores = batch_top_k(snap.combined, queries, TOP_N)
+        rows = []
+        for user, fingerprint, r, sc in zip(users, fingerprints, top_rows.tolist(), top_scores.tolist()):
+            companies = [{**snap.meta[i], 'score': round(float(v), 4)} for i, v in zip(r, sc)]
+            rows.append({
+                'id': user['id'],
+                'email': user.get('email'),
+                'job_recommendations': json.dumps(build_payload(companies, fingerprint, snap.digest)),
+            })
+        rank_seconds += time.perf_counter() - t0
+
+        for start in range(0, len(rows), max(1, write_chunk)):
+            part = rows[start:start + write_chunk]
+            throttle.wait(len(part))
+            if job is not None:
+                job.check_cancelled()
+            result = bulk_update_users(supabase, part, chunk_size=write_chunk)
+            for key in ('written', 'fallback_rows', 'failed'):
+                stats[key] += result[key]
+        stats['users'] += len(users)
+        if job is not None:
+            progress = stats['users'] / total if total else 0.0
+            job.set_progress(min(progress, 0.99), f"{stats['users']} users re-ranked")
+        print(f"[RERANK] {stats['users']}{'/' + str(total) if total else ''} users re-ranked")
+
+    return {
+        **stats,
+        'catalog_version': snap.digest,
+        'companies': int(len(snap.ids)),
+        'rank_seconds': round(rank_seconds, 3),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def schedule_rerank(reason: str) -> Job:
+    """Queue a re-rank job; one already waiting to start is reused (it ranks against the newest catalog)."""
+    manager = get_job_manager()
+    for job in manager.list(RERANK_JOB_KIND):
+        if job.status == 'queued':
+            return job
+    return manager.submit(
+        RERANK_JOB_KIND,
+        lambda job: rerank_all_users(
+            job,
+            chunk_size=int(os.getenv('RERANK_CHUNK_SIZE', '1000')),
+            write_chunk=int(os.getenv('RERANK_WRITE_CHUNK', '100')),
+            writes_per_second=float(os.getenv('RERANK_WRITES_PER_SECOND', '200')),
+        ),
+        params={'reason': reason},
+    )
+
+
+_ranked_lists: Optional[ForecastCache] = None
+_ranked_lists_lock = threading.Lock()
+
+
+def get_ranked_list_cache() -> ForecastCache:
+    """Process-wide LRU of ranked (company ids, scores) arrays keyed by ``ranked_list_key``."""
+    global _ranked_lists
+    if _ranked_lists is None:
+        with _ranked_lists_lock:
+            if _ranked_lists is None:
+                _ranked_lists = ForecastCache(
+                    max_entries=int(os.getenv('RANKED_LIST_CACHE_MAX_ENTRIES', '2000')),
+                    ttl_seconds=float(os.getenv('RANKED_LIST_CACHE_TTL_SECONDS', '900')),
+                )
+    return _ranked_lists
+
+
+def ranked_list_key(user_skills: Sequence[float], user_riasec: Sequence[float], catalog_version: str,
+                    filters: Dict[str, List[str]], depth: int) -> str:
+    """Short id of one ranked list: the recommendation fingerprint at ``depth`` plus the filters."""
+    fingerprint = recommendation_fingerprint(user_skills, user_riasec, catalog_version, top_n=depth)
+    raw = f"{fingerprint}|{json.dumps(filters, sort_keys=True)}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class CursorExpired(Exception):
+    """The cursor's ranked list is gone and the cursor does not say whose list it was."""
+
+
+def encode_cursor(list_key: str, filters: Dict[str, List[str]], score: float, company_id: int, email: str) -> str:
+    """Opaque cursor pointing just past (score, company_id) in ``email``'s list ``list_key``."""
+    raw = json.dumps({'k': list_key, 'e': email, 'f': filters, 's': float(score), 'c': int(company_id)},
+                     separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of ``encode_cursor``; raises ValueError on anything malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return {
+            'list_key': str(data['k']),
+            'email': str(data.get('e') or '').strip().lower(),
+            'filters': normalize_filters(data.get('f')),
+            'score': float(data['s']),
+            'company_id': int(data['c']),
+        }
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+def _position_after(ids: np.ndarray, scores: np.ndarray, score: float, company_id: int) -> int:
+    """Index of the first entry ordered after (score, company_id) in a (score desc, id asc) list."""
+    neg = -scores
+    lo = int(np.searchsorted(neg, -score, side='left'))
+    hi = int(np.searchsorted(neg, -score, side='right'))
+    return lo + int(np.searchsorted(ids[lo:hi], company_id, side='right'))
+
+
+def _load_ranked_list(email: str, filters: Dict[str, List[str]], depth: int) -> Tuple[str, np.ndarray, np.ndarray]:
+    """Rank the user's inputs against the current catalog (cached by list key)."""
+    supabase = get_supabase_client()
+    resp = supabase.table('users').select(USER_INPUT_COLUMNS).eq('email', email).limit(1).execute()
+    if not resp.data:
+        raise LookupError('User not found')
+    user_skills, user_riasec = user_vectors(*inputs_from_user_row(resp.data[0]))
+    index = get_company_index()
+    list_key = ranked_list_key(user_skills, user_riasec, index.catalog_version(), filters, depth)
+    cache = get_ranked_list_cache()
+    cached = cache.get(list_key)
+    if cached is not None:
+        return (list_key, *cached)
+    ids, scores = index.rank_ids(user_skills, user_riasec, depth, filters=filters)
+    cache.put(list_key, (ids, scores))
+    print(f"[OBJECTIVE-3] Ranked {len(ids)} companies for {list_key}")
+    return list_key, ids, scores
+
+
+def recommendation_page(email: str, limit: int = TOP_N, cursor: Optional[str] = None,
+                        filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """One page of the user's ranked companies and the cursor of the next page.
+
+    A cursor whose list is still cached is served without touching the database
+    or re-ranking, so a listing stays stable while it is paged through. Once
+    evicted, the list is rebuilt from the cursor user's current inputs and the
+    page resumes after the cursor's (score, company id). ValueError when
+    ``email`` and the cursor name different users; CursorExpired when an evicted
+    cursor names no user at all (issued before cursors carried one).
+    """
+    depth = max(1, int(os.getenv('RECOMMENDATION_RANK_DEPTH', '500')))
+    after = decode_cursor(cursor) if cursor else None
+    wanted = after['filters'] if after else normalize_filters(filters)
+    if after and after['email']:
+        if email and email != after['email']:
+            raise ValueError('cursor belongs to a different user')
+        email = after['email']
+
+    cached = get_ranked_list_cache().get(after['list_key']) if after else None
+    if cached is not None:
+        list_key, (ids, scores) = after['list_key'], cached
+    elif not email:
+        raise CursorExpired('cursor expired; request the first page again')
+    else:
+        list_key, ids, scores = _load_ranked_list(email, wanted, depth)
+    start = _position_after(ids, scores, after['score'], after['company_id']) if after else 0
+    end = min(len(ids), start + limit)
+    page_ids, page_scores = ids[start:end].tolist(), scores[start:end].tolist()
+
+    next_cursor = None
+    if end < len(ids):
+        next_cursor = encode_cursor(list_key, wanted, page_scores[-1], page_ids[-1], email)
+    return {
+        'email': email,
+        'items': get_company_index().hydrate(page_ids, page_scores),
+        'next_cursor': next_cursor,
+        'total_ranked': int(len(ids)),
+        'max_depth': depth,
+        'limit': limit,
+        'filters': wanted,
+    }
+
+
+def enable_rerank_on_catalog_change() -> None:
+    """Watch the company catalog and queue a re-rank whenever its version changes."""
+    index = get_company_index()
+    index.add_listener(lambda snap: schedule_rerank(f'catalog changed to {snap.digest}'))
+    index.watch()
@@ -0,0 +1,342 @@
+"""
+RIASEC archetype scoring over a precompiled course projection.
+
+Each curriculum course is tagged with one or more RIASEC axes in
+``app/data/curricula.json`` (override with CURRICULUM_PATH). The tags are
+compiled once per file version into a dense (courses x 6) projection matrix
+(axis membership, with a per-course tag count so a grade weight splits evenly
+across the course's axes) plus an id -> row index; the file is re-checked on
+access and recompiled when it changes. Scoring a student is then: grade
+weights x projection rows, a few vectorized Lloyd steps with centroids seeded
+at the six unit axes, and a weighted bincount.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+AXES = ('R', 'I', 'A', 'S', 'E', 'C')
+AXIS_NAMES = ('realistic', 'investigative', 'artistic', 'social', 'enterprising', 'conventional')
+LLOYD_ITERATIONS = 5
+DEFAULT_CURRICULUM_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'curricula.json')
+
+
+class RiasecProjection:
+    """Immutable (courses x 6) axis-membership matrix with an id -> row index."""
+
+    def __init__(self, course_axes: Dict[str, Sequence[str]]):
+        axis_index = {a: i for i, a in enumerate(AXES)}
+        self.ids: Tuple[str, ...] = tuple(course_axes)
+        self.index: Dict[str, int] = {course_id: row for row, course_id in enumerate(self.ids)}
+        # One trailing all-zero row stands in for unknown ids
+        matrix = np.zeros((len(self.ids) + 1, len(AXES)), dtype=np.float64)
+        tag_counts = np.ones(len(self.ids) + 1, dtype=np.float64)
+        for row, course_id in enumerate(self.ids):
+            tags = [axis_index[t] for t in course_axes[course_id] if t in axis_index]
+            matrix[row, tags] = 1.0
+            tag_counts[row] = max(1, len(course_axes[course_id]))
+        matrix.setflags(write=False)
+        tag_counts.setflags(write=False)
+        self.matrix = matrix
+        self.tag_counts = tag_counts
+
+    @property
+    def unknown_row(self) -> int:
+        return len(self.ids)
+
+    def rows_for(self, order_ids: Sequence[str]) -> np.ndarray:
+        """Row indices for courses in ``order_ids`` order (the zero row for unmapped ids)."""
+        rows = np.fromiter((self.index.get(course_id, self.unknown_row) for course_id in order_ids),
+                           dtype=np.int64, count=len(order_ids))
+        rows.setflags(write=False)
+        return rows
+
+    def points(self, rows: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Course points in RIASEC space: each weight shared evenly over its course's axes."""
+        return (weights / self.tag_counts[rows])[..., None] * self.matrix[rows]
+
+
+class Curriculum:
+    """Immutable compiled snapshot of the curriculum data file.
+
+    Holds the projection over every course id (earlier programs win on
+    duplicate ids), the default order (programs in file order) and a small LRU
+    of resolved frontend orders keyed by the order tuple's hash.
+    """
+
+    def __init__(self, doc: Dict[str, Any], signature: Optional[Tuple[int, int]] = None, order_cache_size: int = 256):
+        programs: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        for program in doc.get('programs') or []:
+            key = str(program['program'])
+            programs[key] = {str(c['id']): tuple(c.get('riasec') or ()) for c in program.get('courses') or []}
+        if not programs:
+            raise ValueError('curriculum file defines no programs')
+        course_axes: Dict[str, Tuple[str, ...]] = {}
+        for courses in reversed(list(programs.values())):
+            course_axes.update(courses)
+        self.version = doc.get('version')
+        self.signature = signature
+        self.programs = programs
+        self.projection = RiasecProjection(course_axes)
+        self.default_order: Tuple[str, ...] = tuple(cid for courses in programs.values() for cid in courses)
+        self.default_rows = self.projection.rows_for(self.default_order)
+        self.order_cache_size = max(1, int(order_cache_size))
+        self._orders: 'OrderedDict[Tuple[str, ...], np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.order_hits = 0
+        self.order_misses = 0
+
+    def rows(self, order_ids: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Projection row indices for a frontend order (memoized), or the default order."""
+        if not (order_ids and isinstance(order_ids, list) and all(isinstance(x, str) for x in order_ids)):
+            return self.default_rows
+        key = tuple(order_ids)
+        with self._lock:
+            rows = self._orders.get(key)
+            if rows is not None:
+                self._orders.move_to_end(key)
+                self.order_hits += 1
+                return rows
+            self.order_misses += 1
+        rows = self.projection.rows_for(key)
+        with self._lock:
+            self._orders[key] = rows
+            while len(self._orders) > self.order_cache_size:
+                self._orders.popitem(last=False)
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'version': self.version,
+                'programs': {name: len(courses) for name, courses in self.programs.items()},
+                'courses': len(self.projection.ids),
+                'orders_cached': len(self._orders),
+                'order_hits': self.order_hits,
+                'order_misses': self.order_misses,
+            }
+
+
+class CurriculumRegistry:
+    """Serves the compiled curriculum, recompiling when the data file's mtime/size changes."""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._current: Optional[Curriculum] = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._failed_signature: Optional[Tuple[int, int]] = None
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def current(self) -> Curriculum:
+        signature = self._signature(self.path)
+        current = self._current
+        if current is not None and (signature is None or signature in (current.signature, self._failed_signature)):
+            return current
+        with self._lock:
+            current = self._current
+            if current is not None and (signature is None or signature in (current.signature, self._failed_signature)):
+                return current
+            try:
+                with open(self.path, 'r', encoding='utf-8') as fh:
+                    compiled = Curriculum(json.load(fh), signature)
+            except Exception as e:
+                # Keep serving the last good index if an edit is mid-write or malformed
+                self.last_error = str(e)
+                self._failed_signature = signature
+                if current is not None:
+                    print(f"[CURRICULUM] Reload of {self.path} failed, keeping version {current.version}: {e}")
+                    return current
+                raise
+            if current is not None:
+                self.reloads += 1
+                print(f"[CURRICULUM] Reloaded {self.path} (version {compiled.version})")
+            self._current = compiled
+            self.last_error = None
+            self._failed_signature = None
+            return compiled
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.current().stats(), 'path': self.path, 'reloads': self.reloads, 'last_error': self.last_error}
+
+
+_registry: Optional[CurriculumRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_curriculum_registry() -> CurriculumRegistry:
+    """Return the process-wide curriculum registry (created on first use)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CurriculumRegistry(os.getenv('CURRICULUM_PATH') or DEFAULT_CURRICULUM_PATH)
+    return _registry
+
+
+def grade_weights(grades: Sequence[Any]) -> np.ndarray:
+    """1.00 (best) .. 4.00 (fail) -> weight 3..0; zero/invalid/out-of-range grades weigh 0."""
+    try:
+        x = np.asarray(grades, dtype=np.float64)
+    except (TypeError, ValueError):
+        x = np.asarray([_to_float(g) for g in grades], dtype=np.float64)
+    x = np.nan_to_num(x, nan=0.0)
+    return np.where((x >= 1.0) & (x <= 4.0), np.maximum(0.0, 4.0 - x), 0.0)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def cluster_totals(X: np.ndarray, iterations: int = LLOYD_ITERATIONS) -> np.ndarray:
+    """Lloyd's algorithm on course points (seeded at the unit axes); weight mass per cluster."""
+    centroids = np.eye(len(AXES), dtype=np.float64)
+    k = centroids.shape[0]
+    for _ in range(iterations):
+        labels = np.argmin(np.linalg.norm(X[:, None, :] - centroids[None, :, :], axis=2), axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        moved = counts > 0
+        centroids[moved] = sums[moved] / counts[moved, None]
+    labels = np.argmin(np.linalg.norm(X[:, None, :] - centroids[None, :, :], axis=2), axis=1)
+    return np.bincount(labels, weights=X.sum(axis=1), minlength=k)
+
+
+def archetype_from_totals(totals: np.ndarray) -> Dict[str, Any]:
+    total_sum = float(totals.sum())
+    if total_sum <= 0:
+        return {}
+    percentages = (totals / total_sum) * 100.0
+    return {
+        'primary_archetype': AXIS_NAMES[int(np.argmax(percentages))],
+        'archetype_percentages': {name: round(float(p), 2) for name, p in zip(AXIS_NAMES, percentages)},
+        'archetype_scores': {name: round(float(s), 3) for name, s in zip(AXIS_NAMES, totals)},
+    }
+
+
+def score_riasec(grades: Sequence[Any], order_ids: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """RIASEC archetype for one student's grades aligned with ``order_ids`` (or the default order)."""
+    if not grades:
+        return {}
+    curriculum = get_curriculum_registry().current()
+    rows = curriculum.rows(order_ids)
+    n = min(len(rows), len(grades))
+    weights = grade_weights(grades[:n])
+    points = curriculum.projection.points(rows[:n], weights)
+    points = points[points.any(axis=1)]
+    if points.shape[0] == 0:
+        return {}
+    return archetype_from_totals(cluster_totals(points))
+
+
+def _assign(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid per (student, course) for (S x C x 6) points and (S x 6 x 6) centroids."""
+    k = centroids.shape[1]
+    planes = np.moveaxis(points, 2, 0)
+    distances = np.empty((k,) + points.shape[:2], dtype=np.float64)
+    diff = np.empty(points.shape[:2], dtype=np.float64)
+    # Accumulate axis by axis over (S x C) planes; same summation order as np.linalg.norm
+    for j in range(k):
+        acc = distances[j]
+        for axis in range(points.shape[2]):
+            np.subtract(planes[axis], centroids[:, j, axis, None], out=diff)
+            np.multiply(diff, diff, out=diff)
+            if axis == 0:
+                acc[...] = diff
+            else:
+                acc += diff
+        np.sqrt(acc, out=acc)
+    return np.argmin(distances, axis=0)
+
+
+def cluster_totals_batch(points: np.ndarray, valid: np.ndarray, iterations: int = LLOYD_ITERATIONS,
+                         early_stop: bool = True) -> np.ndarray:
+    """Batched ``cluster_totals`` over an (S x C x 6) tensor; ``valid`` masks padded/zero courses.
+
+    Every student runs the same Lloyd steps as the single-student path. With
+    ``early_stop`` a student leaves the active set once none of its assignments
+    change, which is exact: unchanged labels reproduce the same centroids.
+    """
+    n_students, n_courses, k = points.shape
+    centroids = np.broadcast_to(np.eye(k, dtype=np.float64), (n_students, k, k)).copy()
+    clusters = np.arange(k)
+    labels_out = np.empty((n_students, n_courses), dtype=np.int64)
+    active = np.arange(n_students)
+    previous = None
+    for _ in range(iterations):
+        active_points = points[active]
+        active_valid = valid[active]
+        labels = _assign(active_points, centroids[active])
+        if early_stop and previous is not None:
+            settled = ((labels == previous) | ~active_valid).all(axis=1)
+            labels_out[active[settled]] = labels[settled]
+            keep = ~settled
+            active, labels = active[keep], labels[keep]
+            active_points, active_valid = active_points[keep], active_valid[keep]
+            if active.size == 0:
+                break
+        members = ((labels[..., None] == clusters) & active_valid[..., None]).transpose(0, 2, 1).astype(np.float64)
+        counts = members.sum(axis=2)
+        sums = np.matmul(members, active_points)
+        moved = counts > 0
+        current = centroids[active]
+        current[moved] = sums[moved] / counts[moved][:, None]
+        centroids[active] = current
+        previous = labels
+    if active.size:
+        labels_out[active] = _assign(points[active], centroids[active])
+    members = ((labels_out[..., None] == clusters) & valid[..., None]).transpose(0, 2, 1).astype(np.float64)
+    return np.matmul(members, points.sum(axis=2)[..., None])[..., 0]
+
+
+def score_riasec_batch(grade_rows: Sequence[Sequence[Any]], order_ids: Optional[Sequence[str]] = None,
+                       iterations: int = LLOYD_ITERATIONS, early_stop: bool = True,
+                       chunk_size: int = 1024) -> List[Dict[str, Any]]:
+    """RIASEC archetypes for many students sharing one course order.
+
+    Students are scored ``chunk_size`` at a time on a (students x courses x 6)
+    tensor, which bounds the (students x courses x 6 x 6) distance temporary.
+    Returns one result per row ({} where no course carries weight).
+    """
+    curriculum = get_curriculum_registry().current()
+    rows = curriculum.rows(order_ids)
+    results: List[Dict[str, Any]] = [{} for _ in grade_rows]
+    n_courses = len(rows)
+    for start in range(0, len(grade_rows), max(1, int(chunk_size))):
+        chunk = grade_rows[start:start + chunk_size]
+        # Courses past the longest grade vector in the chunk cannot contribute
+        width = min(n_courses, max((len(grades or []) for grades in chunk), default=0))
+        grades = np.zeros((len(chunk), width), dtype=np.float64)
+        for i, row in enumerate(chunk):
+            n = min(width, len(row or []))
+            if n:
+                try:
+                    grades[i, :n] = row[:n]
+                except (TypeError, ValueError):
+                    grades[i, :n] = [_to_float(g) for g in row[:n]]
+        weights = grade_weights(grades)
+        points = curriculum.projection.points(rows[:width], weights)
+        valid = points.any(axis=2)
+        scored = np.flatnonzero(valid.any(axis=1))
+        if scored.size == 0:
+            continue
+        totals = cluster_totals_batch(points[scored], valid[scored], iterations, early_stop)
+        for i, student_totals in zip(scored, totals):
+            results[start + int(i)] = archetype_from_totals(student_totals)
+    return results
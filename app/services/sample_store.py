@@ -0,0 +1,255 @@
+"""
+Append-only on-disk store of labelled training samples.
+
+Samples live in two raw little-endian float32 files, ``X.f32`` (rows x features)
+and ``Y.f32`` (rows x labels), plus ``meta.json`` holding the committed row
+count. Appends write the array bytes first and bump the row count last, so a
+reader that memory-maps ``meta['rows']`` rows never sees a partial sample, and
+they never rewrite committed rows. ``clear()`` does remove them, so long-lived
+readers (training jobs) map the files through ``lease()``, which holds a shared
+lock that ``clear()`` waits for.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+
+class SampleStoreBusy(Exception):
+    """The store is leased by a reader and could not be cleared in time."""
+
+
+class SampleLease:
+    """Read-only (X, Y) rows of a store, protected from ``clear()`` until closed."""
+
+    def __init__(self, X: np.ndarray, Y: np.ndarray, lock_fh):
+        self.X = X
+        self.Y = Y
+        self._lock_fh = lock_fh
+
+    def close(self) -> None:
+        if self._lock_fh is not None:
+            self._lock_fh.close()
+            self._lock_fh = None
+
+    def __enter__(self) -> 'SampleLease':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SampleStore:
+    def __init__(self, directory: str, labels: List[str]):
+        self.directory = os.path.abspath(directory)
+        self.labels = list(labels)
+        self._lock = threading.Lock()
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, 'meta.json')
+
+    @property
+    def _x_path(self) -> str:
+        return os.path.join(self.directory, 'X.f32')
+
+    @property
+    def _y_path(self) -> str:
+        return os.path.join(self.directory, 'Y.f32')
+
+    def meta(self) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {'rows': 0, 'n_features': None, 'labels': self.labels}
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        tmp = self._meta_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(meta, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self._meta_path)
+
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        fh = open(os.path.join(self.directory, '.lock'), 'a+')
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        return fh
+
+    def _readers_lock(self, exclusive: bool, timeout: Optional[float] = None):
+        """flock on ``.readers``: shared for leases, exclusive for clear (polled until ``timeout``)."""
+        os.makedirs(self.directory, exist_ok=True)
+        fh = open(os.path.join(self.directory, '.readers'), 'a+')
+        if fcntl is None:
+            return fh
+        if not exclusive:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_SH)
+            return fh
+        deadline = None if timeout is None else time.monotonic() + float(timeout)
+        while True:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fh
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    fh.close()
+                    raise SampleStoreBusy('sample store is in use by a training job')
+                time.sleep(0.05)
+
+    def append(self, X: np.ndarray, Y: np.ndarray) -> int:
+        """Append aligned sample rows; returns the committed row count afterwards."""
+        X = np.ascontiguousarray(X, dtype='<f4')
+        Y = np.ascontiguousarray(Y, dtype='<f4')
+        if X.shape[0] != Y.shape[0] or Y.shape[1] != len(self.labels):
+            raise ValueError('X/Y row counts or label width do not match the store')
+        if X.shape[0] == 0:
+            return int(self.meta().get('rows') or 0)
+        with self._lock:
+            lock_fh = self._file_lock()
+            try:
+                meta = self.meta()
+                n_features = meta.get('n_features')
+                if n_features is None:
+                    n_features = int(X.shape[1])
+                elif X.shape[1] != n_features:
+                    raise ValueError(f'store holds {n_features}-feature rows, got {X.shape[1]}')
+                rows = int(meta.get('rows') or 0)
+                # Drop any bytes left behind by an interrupted append before writing
+                for path, width, arr in ((self._x_path, n_features, X), (self._y_path, len(self.labels), Y)):
+                    with open(path, 'ab') as fh:
+                        fh.truncate(rows * width * 4)
+                        fh.seek(rows * width * 4)
+                        fh.write(arr.tobytes())
+                        fh.flush()
+                        os.fsync(fh.fileno())
+                rows += int(X.shape[0])
+                self._write_meta({'rows': rows, 'n_features': n_features, 'labels': self.labels})
+                return rows
+            finally:
+                lock_fh.close()
+
+    def arrays(self, start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Memory-map committed rows ``start:`` as read-only (X, Y) float32 arrays."""
+        meta = self.meta()
+        rows = int(meta.get('rows') or 0)
+        n_features = meta.get('n_features')
+        start = max(0, min(int(start), rows))
+        if rows == 0 or not n_features:
+            return np.zeros((0, n_features or 0), dtype=np.float32), np.zeros((0, len(self.labels)), dtype=np.float32)
+        X = np.memmap(self._x_path, dtype='<f4', mode='r', shape=(rows, int(n_features)))
+        Y = np.memmap(self._y_path, dtype='<f4', mode='r', shape=(rows, len(self.labels)))
+        return X[start:], Y[start:]
+
+    def lease(self, start: int = 0) -> SampleLease:
+        """Like ``arrays`` but keeps ``clear()`` out until the lease is closed."""
+        lock_fh = self._readers_lock(exclusive=False)
+        try:
+            X, Y = self.arrays(start)
+        except Exception:
+            lock_fh.close()
+            raise
+        return SampleLease(X, Y, lock_fh)
+
+    def clear(self, timeout: Optional[float] = None) -> None:
+        """Remove every sample once no lease is open; SampleStoreBusy after ``timeout`` seconds."""
+        readers_fh = self._readers_lock(exclusive=True, timeout=timeout)
+        try:
+            with self._lock:
+                lock_fh = self._file_lock()
+                try:
+                    for path in (self._x_path, self._y_path, self._meta_path):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                finally:
+                    lock_fh.close()
+        finally:
+            readers_fh.close()
+
+    def stats(self) -> Dict[str, Any]:
+        meta = self.meta()
+        rows = int(meta.get('rows') or 0)
+        n_features = meta.get('n_features') or 0
+        return {
+            'directory': self.directory,
+            'rows': rows,
+            'n_features': meta.get('n_features'),
+            'n_labels': len(self.labels),
+            'bytes': rows * (int(n_features) + len(self.labels)) * 4,
+        }
+
+
+def sample_vectors(sample: Dict[str, Any], labels: List[str], n_features: Optional[int]) -> Optional[Tuple[List[float], List[float]]]:
+    """Turn one {grades, labels} sample into clipped (features, targets); None if unusable."""
+    try:
+        vec = [min(4.0, max(0.0, float(x))) for x in (sample.get('grades') or [])]
+    except Exception:
+        return None
+    if not vec:
+        return None
+    if n_features:
+        vec = (vec + [0.0] * n_features)[:n_features]
+    lbs = sample.get('labels') or {}
+    target = []
+    for name in labels:
+        try:
+            v = float(lbs.get(name, 0.0))
+        except Exception:
+            v = 0.0
+        target.append(min(1.0, max(0.0, v)))
+    return vec, target
+
+
+def ingest_ndjson(store: SampleStore, lines: Iterable[bytes], n_features: Optional[int] = None,
+                  chunk_rows: int = 4096) -> Dict[str, int]:
+    """Parse NDJSON samples line by line and append them to ``store`` in chunks.
+
+    Only one chunk of rows is held in memory at a time, so the upload size is
+    bounded by disk rather than by the request body or heap.
+    """
+    n_features = n_features or store.meta().get('n_features')
+    accepted = rejected = 0
+    X_chunk: List[List[float]] = []
+    Y_chunk: List[List[float]] = []
+    rows = int(store.meta().get('rows') or 0)
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            sample = json.loads(line)
+        except ValueError:
+            rejected += 1
+            continue
+        if not isinstance(sample, dict):
+            rejected += 1
+            continue
+        if n_features is None:
+            n_features = len(sample.get('grades') or []) or None
+        parsed = sample_vectors(sample, store.labels, n_features)
+        if parsed is None:
+            rejected += 1
+            continue
+        X_chunk.append(parsed[0])
+        Y_chunk.append(parsed[1])
+        if len(X_chunk) >= chunk_rows:
+            rows = store.append(np.asarray(X_chunk, dtype=np.float32), np.asarray(Y_chunk, dtype=np.float32))
+            accepted += len(X_chunk)
+            X_chunk, Y_chunk = [], []
+    if X_chunk:
+        rows = store.append(np.asarray(X_chunk, dtype=np.float32), np.asarray(Y_chunk, dtype=np.float32))
+        accepted += len(X_chunk)
+    return {'accepted': accepted, 'rejected': rejected, 'rows': rows}
@@ -0,0 +1,185 @@
+"""
+Shadow evaluation of candidate career models.
+
+A candidate artifact is registered per program with a sample rate. Sampled
+/process requests hand their grade vector and live top-6 to a background
+executor, which scores the candidate (and re-times the live model) off the
+request path and accumulates latency and top-6 overlap statistics. Submissions
+are dropped, not queued, when the executor is saturated.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from joblib import load
+
+from app.services.career_ranking import rank_top_careers
+from app.services.compiled_forest import compile_forest
+from app.services.model_registry import get_model_registry
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    return round(float(np.percentile(list(values), q)), 3) if values else None
+
+
+class ShadowCandidate:
+    def __init__(self, program: str, path: str, bundle: Dict[str, Any], sample_rate: float, window: int = 2000):
+        self.program = program
+        self.path = path
+        self.bundle = bundle
+        self.forest = compile_forest(bundle)
+        self.sample_rate = sample_rate
+        self.registered_at = time.time()
+        self.lock = threading.Lock()
+        self.scored = 0
+        self.errors = 0
+        self.exact_matches = 0
+        self.overlap_sum = 0.0
+        self.candidate_ms = deque(maxlen=window)
+        self.live_ms = deque(maxlen=window)
+        self.last_error: Optional[str] = None
+
+    def record(self, overlap: float, exact: bool, candidate_ms: float, live_ms: Optional[float]) -> None:
+        with self.lock:
+            self.scored += 1
+            self.overlap_sum += overlap
+            self.exact_matches += int(exact)
+            self.candidate_ms.append(candidate_ms)
+            if live_ms is not None:
+                self.live_ms.append(live_ms)
+
+    def record_error(self, error: str) -> None:
+        with self.lock:
+            self.errors += 1
+            self.last_error = error
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'program': self.program,
+                'path': self.path,
+                'sample_rate': self.sample_rate,
+                'registered_at': self.registered_at,
+                'n_trees': self.forest.n_trees,
+                'feature_len': self.forest.n_features_in_,
+                'scored': self.scored,
+                'errors': self.errors,
+                'last_error': self.last_error,
+                'top6_overlap_mean': round(self.overlap_sum / self.scored, 4) if self.scored else None,
+                'top6_exact_rate': round(self.exact_matches / self.scored, 4) if self.scored else None,
+                'candidate_latency_ms': {'p50': _percentile(self.candidate_ms, 50), 'p99': _percentile(self.candidate_ms, 99)},
+                'live_latency_ms': {'p50': _percentile(self.live_ms, 50), 'p99': _percentile(self.live_ms, 99)},
+            }
+
+
+class ShadowEvaluator:
+    def __init__(self, max_workers: int = 1, max_pending: int = 64):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix='gradalyze-shadow')
+        self._candidates: Dict[str, ShadowCandidate] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.max_pending = max(1, int(max_pending))
+        self.dropped = 0
+
+    def register(self, program: str, path: str, sample_rate: float) -> Tuple[Optional[ShadowCandidate], Optional[str]]:
+        live_path = get_model_registry().path_for(program)
+        if not live_path:
+            return None, f'No model registered for program {program!r}'
+        models_dir = os.path.dirname(live_path)
+        path = os.path.abspath(path if os.path.isabs(path) else os.path.join(models_dir, path))
+        if os.path.commonpath([path, models_dir]) != models_dir:
+            return None, 'Candidate artifact must live in the models directory'
+        if path == live_path:
+            return None, 'Candidate artifact is the live artifact'
+        if not os.path.exists(path):
+            return None, f'Candidate artifact not found at {path}'
+        try:
+            bundle = load(path)
+            candidate = ShadowCandidate(program, path, bundle, max(0.0, min(1.0, float(sample_rate))))
+        except Exception as e:
+            return None, f'Failed to load candidate: {e}'
+        with self._lock:
+            self._candidates[program] = candidate
+        return candidate, None
+
+    def unregister(self, program: str) -> Optional[ShadowCandidate]:
+        with self._lock:
+            return self._candidates.pop(program, None)
+
+    def get(self, program: str) -> Optional[ShadowCandidate]:
+        with self._lock:
+            return self._candidates.get(program)
+
+    def maybe_submit(self, program: str, grades: List[float], live_labels: List[str]) -> bool:
+        """Called on the request path: a dict lookup and a coin flip, nothing else."""
+        candidate = self._candidates.get(program)
+        if candidate is None or not live_labels or random.random() >= candidate.sample_rate:
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+        self._executor.submit(self._score, candidate, list(grades), list(live_labels))
+        return True
+
+    def _score(self, candidate: ShadowCandidate, grades: List[float], live_labels: List[str]) -> None:
+        try:
+            X = np.asarray([grades], dtype=np.float32)
+            if X.shape[1] != candidate.forest.n_features_in_:
+                candidate.record_error(f'expected {candidate.forest.n_features_in_} grades, got {X.shape[1]}')
+                return
+            t0 = time.perf_counter()
+            top, _, constant = rank_top_careers(candidate.forest.predict(X), k=len(live_labels))
+            candidate_ms = (time.perf_counter() - t0) * 1000.0
+            if constant[0]:
+                candidate.record_error('candidate produced constant scores')
+                return
+
+            live_ms = None
+            live_bundle, _ = get_model_registry().get_inference_bundle(candidate.program)
+            if live_bundle is not None and getattr(live_bundle.get('model'), 'n_features_in_', None) == X.shape[1]:
+                t0 = time.perf_counter()
+                rank_top_careers(live_bundle['model'].predict(X), k=len(live_labels))
+                live_ms = (time.perf_counter() - t0) * 1000.0
+
+            labels = candidate.forest.labels
+            cand_labels = [labels[j] for j in top[0]]
+            overlap = len(set(cand_labels) & set(live_labels)) / float(len(live_labels))
+            candidate.record(overlap, cand_labels == list(live_labels), candidate_ms, live_ms)
+        except Exception as e:
+            candidate.record_error(str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            candidates = list(self._candidates.values())
+            pending = self._pending
+        return {
+            'pending': pending,
+            'max_pending': self.max_pending,
+            'dropped': self.dropped,
+            'candidates': {c.program: c.summary() for c in candidates},
+        }
+
+
+_evaluator: Optional[ShadowEvaluator] = None
+_evaluator_lock = threading.Lock()
+
+
+def get_shadow_evaluator() -> ShadowEvaluator:
+    """Return the process-wide shadow evaluator (created on first use)."""
+    global _evaluator
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None:
+                _evaluator = ShadowEvaluator(max_pending=int(os.getenv('SHADOW_MAX_PENDING', '64')))
+    return _evaluator
@@ -0,0 +1,105 @@
+"""
+Benchmark: objective-3 company ranking latency and recall across catalog sizes.
+
+Synthetic companies are drawn around a few dozen sector profiles (so the
+catalog is clustered like real employers). For each size the script times:
+
+- ``legacy``: the previous per-company Python cosine plus full sort (small sizes only)
+- ``full sort``: one matrix-vector product plus ``argsort`` of every score
+- ``blocked``: ``blocked_top_k`` (the exact path ``CompanyIndex.rank`` uses)
+- ``ivf/N``: the IVF index probing N lists, with recall@k against exact ranking
+
+Run from the backend root:
+    python -m benchmarks.bench_company_rank [--sizes 1000,10000,100000,300000] [--queries 200]
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.services.company_index import CompanyIndex, IvfIndex, blocked_top_k, unit_vector
+
+
+def synthetic_catalog(n: int, rng: np.random.Generator, profiles: int = 40):
+    centers = rng.dirichlet(np.full(12, 0.6), size=profiles)
+    which = rng.integers(0, profiles, size=n)
+    vecs = np.clip(centers[which] + rng.normal(0, 0.08, size=(n, 12)), 0, 1).round(2)
+    return [{
+        'id': i + 1,
+        'name': f'company-{i}',
+        'updated_at': '2026-01-01T00:00:00+00:00',
+        'active': True,
+        'skills_vector': vecs[i, :6].tolist(),
+        'riasec_weights': vecs[i, 6:].tolist(),
+    } for i in range(n)]
+
+
+def synthetic_users(count: int, rng: np.random.Generator):
+    return [(rng.uniform(0, 3, 6).tolist(), rng.dirichlet(np.ones(6)).tolist()) for _ in range(count)]
+
+
+def legacy_rank(rows, user_skills, user_riasec, k):
+    def cosine(a, b):
+        if not a or not b or len(a) != len(b):
+            return 0.0
+        dot = sum(float(x) * float(y) for x, y in zip(a, b))
+        na = math.sqrt(sum(float(x) * float(x) for x in a)) or 1e-9
+        nb = math.sqrt(sum(float(y) * float(y) for y in b)) or 1e-9
+        return dot / (na * nb)
+
+    scored = [(0.6 * cosine(user_skills, r['skills_vector']) + 0.4 * cosine(user_riasec, r['riasec_weights']), r) for r in rows]
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return scored[:k]
+
+
+def per_query_us(fn, queries) -> float:
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - t0) / len(queries) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000,300000')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--nprobe', default='4,8,16')
+    parser.add_argument('--legacy-max', type=int, default=10000, help='largest catalog timed with the legacy loop')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    users = synthetic_users(args.queries, rng)
+    queries = [np.concatenate([0.6 * unit_vector(s), 0.4 * unit_vector(r)]) for s, r in users]
+    nprobes = [int(x) for x in args.nprobe.split(',') if x]
+    k = args.k
+
+    for n in [int(x) for x in args.sizes.split(',') if x]:
+        rows = synthetic_catalog(n, rng)
+        index = CompanyIndex(refresh_interval=1e9, full_reload_interval=1e9)
+        index.load_rows(rows)
+        matrix = index.snapshot().combined
+        exact = [blocked_top_k(matrix, q, k, index.block_rows)[0] for q in queries]
+
+        line = [f'{n:>7} companies']
+        if n <= args.legacy_max:
+            few = users[:max(1, min(len(users), 20))]
+            line.append(f'legacy {per_query_us(lambda u: legacy_rank(rows, u[0], u[1], k), few):9.0f} us')
+        line.append(f'full sort {per_query_us(lambda q: np.argsort(-(matrix @ q), kind="stable")[:k], queries):7.0f} us')
+        line.append(f'blocked {per_query_us(lambda q: blocked_top_k(matrix, q, k, index.block_rows), queries):7.0f} us')
+
+        t0 = time.perf_counter()
+        ivf = IvfIndex.build(matrix)
+        build = time.perf_counter() - t0
+        for nprobe in nprobes:
+            us = per_query_us(lambda q: ivf.search(matrix, q, k, nprobe), queries)
+            hits = sum(len(np.intersect1d(ivf.search(matrix, q, k, nprobe)[0], ex)) for q, ex in zip(queries, exact))
+            line.append(f'ivf/{nprobe} {us:6.0f} us recall {hits / (k * len(queries)):.3f}')
+        line.append(f'(ivf build {build:.2f}s, {ivf.nlist} lists)')
+        print(' | '.join(line))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: sklearn RandomForestRegressor vs. the compiled, array-backed forest.
+
+Trains a career-sized forest on synthetic data (same generator as the CS
+bootstrap), compiles it, and reports memory footprint, single-row and batch
+latency, and top-6 agreement with the sklearn pipeline.
+
+Run from the backend root:
+    python -m benchmarks.bench_compiled_forest [--trees 180] [--depth 22]
+"""
+
+import argparse
+import io
+import pickle
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from app.services.compiled_forest import compile_forest
+
+
+def synthetic_dataset(n_samples: int, n_features: int, n_labels: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0.0, 4.0, size=(n_samples, n_features))
+    Y = np.zeros((n_samples, n_labels))
+    for j in range(n_labels):
+        start = (j * 3) % max(1, n_features - 8)
+        end = min(n_features, start + 12)
+        weights = np.linspace(0.6, 1.8, end - start)
+        Y[:, j] = np.tanh((X[:, start:end] * weights).mean(axis=1) / 3.0) + rng.normal(0, 0.05, size=n_samples)
+    return X, Y
+
+
+def top6(scores: np.ndarray) -> np.ndarray:
+    lo = scores.min(axis=1, keepdims=True)
+    hi = scores.max(axis=1, keepdims=True)
+    probs = (scores - lo) / np.where(hi == lo, 1.0, hi - lo)
+    return np.argsort(-probs, axis=1, kind='stable')[:, :6], probs
+
+
+def timed(fn, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples = np.array(samples) * 1000.0
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trees', type=int, default=180)
+    parser.add_argument('--depth', type=int, default=22)
+    parser.add_argument('--features', type=int, default=53)
+    parser.add_argument('--labels', type=int, default=40)
+    parser.add_argument('--samples', type=int, default=1600)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    X, Y = synthetic_dataset(args.samples, args.features, args.labels)
+    model = RandomForestRegressor(random_state=42, n_estimators=args.trees, max_depth=args.depth, n_jobs=-1).fit(X, Y)
+    model.set_params(n_jobs=None)
+    bundle = {'model': model, 'labels': [f'job_{i}' for i in range(args.labels)]}
+
+    t0 = time.perf_counter()
+    forest = compile_forest(bundle)
+    compile_ms = (time.perf_counter() - t0) * 1000.0
+
+    buf = io.BytesIO()
+    pickle.dump(bundle, buf, protocol=pickle.HIGHEST_PROTOCOL)
+    sklearn_bytes = buf.getbuffer().nbytes
+
+    rng = np.random.default_rng(7)
+    queries = rng.uniform(1.0, 3.0, size=(args.batch, args.features))
+    single = queries[:1]
+
+    sk_single = timed(lambda: model.predict(single), args.repeats)
+    cf_single = timed(lambda: forest.predict(single), args.repeats)
+    sk_batch = timed(lambda: model.predict(queries), max(3, args.repeats // 10))
+    cf_batch = timed(lambda: forest.predict(queries), max(3, args.repeats // 10))
+
+    sk_scores = model.predict(queries)
+    cf_scores = forest.predict(queries)
+    sk_top, sk_probs = top6(sk_scores)
+    cf_top, cf_probs = top6(cf_scores)
+    exact = float(np.mean(np.all(sk_top == cf_top, axis=1)))
+    overlap = float(np.mean([len(set(a) & set(b)) / 6.0 for a, b in zip(sk_top, cf_top)]))
+    max_prob_diff = float(np.max(np.abs(sk_probs - cf_probs)))
+
+    print(f'forest: {args.trees} trees, depth {args.depth}, {forest.n_nodes} nodes, '
+          f'{args.features} features, {args.labels} outputs (compiled in {compile_ms:.0f} ms)')
+    print(f'memory   sklearn pickle {sklearn_bytes / 1e6:8.1f} MB | compiled arrays {forest.nbytes / 1e6:8.1f} MB')
+    print(f'1 row    sklearn p50 {sk_single[0]:7.2f} ms p99 {sk_single[1]:7.2f} ms | '
+          f'compiled p50 {cf_single[0]:7.2f} ms p99 {cf_single[1]:7.2f} ms')
+    print(f'{args.batch} rows sklearn p50 {sk_batch[0]:7.2f} ms p99 {sk_batch[1]:7.2f} ms | '
+          f'compiled p50 {cf_batch[0]:7.2f} ms p99 {cf_batch[1]:7.2f} ms')
+    print(f'top-6    identical order {exact:.2%} | set overlap {overlap:.2%} | max |dprob| {max_prob_diff:.2e}')
+
+
+if __name__ == '__main__':
+    main()
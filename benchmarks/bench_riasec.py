@@ -0,0 +1,128 @@
+"""
+Benchmark: per-call RIASEC scoring before and after the precompiled projection.
+
+``legacy_score`` reproduces the previous ``calculate_riasec_archetype`` body
+(mapping dicts and curriculum order rebuilt per call, one NumPy vector per
+course, Python loop for the final assignment). Both paths score the same random
+students; the script reports per-call latency and confirms identical output.
+The cohort path (``score_riasec_batch``) is timed per student on the same data.
+
+Run from the backend root:
+    python -m benchmarks.bench_riasec [--students 2000] [--repeats 5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.riasec import AXES, AXIS_NAMES, get_curriculum_registry, score_riasec, score_riasec_batch
+
+PROGRAMS = get_curriculum_registry().current().programs
+
+
+def legacy_score(grades, order_ids=None):
+    if not grades:
+        return {}
+
+    def grade_to_weight(g):
+        try:
+            x = float(g)
+        except Exception:
+            return 0.0
+        if x <= 0 or x < 1 or x > 4:
+            return 0.0
+        return max(0.0, 4.0 - x)
+
+    axis_index = {a: i for i, a in enumerate(AXES)}
+    # The old code evaluated both dict literals on every call
+    id_to_axes = {k: list(v) for k, v in PROGRAMS['it'].items()}
+    id_to_axes_cs = {k: list(v) for k, v in PROGRAMS['cs'].items()}
+    curriculum_order = list(id_to_axes.keys())
+    if order_ids and isinstance(order_ids, list) and all(isinstance(x, str) for x in order_ids):
+        curriculum_order = list(order_ids)
+    else:
+        curriculum_order += list(id_to_axes_cs.keys())
+
+    points = []
+    for idx, course_id in enumerate(curriculum_order):
+        if idx >= len(grades):
+            break
+        w = grade_to_weight(grades[idx])
+        if w <= 0:
+            continue
+        tags = id_to_axes.get(course_id, id_to_axes_cs.get(course_id, []))
+        if not tags:
+            continue
+        vec = np.zeros(6, dtype=float)
+        share = w / len(tags)
+        for t in tags:
+            vec[axis_index[t]] = share
+        points.append(vec)
+    if not points:
+        return {}
+
+    X = np.vstack(points)
+    centroids = np.eye(6, dtype=float)
+    for _ in range(5):
+        labels = np.argmin(np.linalg.norm(X[:, None, :] - centroids[None, :, :], axis=2), axis=1)
+        for k in range(6):
+            mask = labels == k
+            if np.any(mask):
+                centroids[k] = X[mask].mean(axis=0)
+    totals = np.zeros(6, dtype=float)
+    for vec in X:
+        k = int(np.argmin(np.linalg.norm(vec[None, :] - centroids, axis=1)))
+        totals[k] += vec.sum()
+
+    total_sum = float(totals.sum())
+    if total_sum <= 0:
+        return {}
+    percentages = (totals / total_sum) * 100.0
+    return {
+        'primary_archetype': AXIS_NAMES[int(np.argmax(percentages))],
+        'archetype_percentages': {n: round(float(p), 2) for n, p in zip(AXIS_NAMES, percentages)},
+        'archetype_scores': {n: round(float(s), 3) for n, s in zip(AXIS_NAMES, totals)},
+    }
+
+
+def per_call_us(fn, students, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for grades in students:
+            fn(grades)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(students) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    n_courses = len(PROGRAMS['it'])
+    students = [rng.choice([0.0, 1.0, 1.25, 1.5, 1.75, 2.0, 2.25, 2.5, 2.75, 3.0], n_courses).tolist()
+                for _ in range(args.students)]
+
+    mismatches = sum(legacy_score(g) != score_riasec(g) for g in students)
+    batch_mismatches = sum(a != b for a, b in zip(score_riasec_batch(students), map(score_riasec, students)))
+    before = per_call_us(legacy_score, students, args.repeats)
+    after = per_call_us(score_riasec, students, args.repeats)
+    best = float('inf')
+    for _ in range(args.repeats):
+        t0 = time.perf_counter()
+        score_riasec_batch(students)
+        best = min(best, time.perf_counter() - t0)
+    batch = best / len(students) * 1e6
+
+    print(f'{args.students} students x {n_courses} courses')
+    print(f'per call  legacy {before:8.1f} us | compiled projection {after:8.1f} us | {before / after:4.1f}x')
+    print(f'cohort    batch tensor {batch:8.1f} us per student | {before / batch:4.1f}x vs legacy')
+    print(f'output    {mismatches} mismatching results (single), {batch_mismatches} (batch)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark: TOR page extraction with and without the text-layer fast path.
+
+Builds synthetic TORs mixing registrar-style pages (a real text layer) and
+scanned pages (a JPEG with no text layer) at several text-page ratios, then
+times ``extract_pages`` two ways:
+
+- ``ocr all``: every page rendered and OCR'd (the previous behaviour)
+- ``text layer``: the page text layer first, OCR only for scanned, low-text or grade-less pages
+
+and checks that both paths find the same grades. OCR runs through the pooled
+EasyOCR readers; on a machine without EasyOCR weights pass
+``--simulated-ocr-ms`` to stand in a fixed per-page OCR cost.
+
+Run from the backend root:
+    python -m benchmarks.bench_tor_extract [--docs 20] [--pages 4] [--ratios 1,0.75,0.5,0]
+"""
+
+import argparse
+import io
+import re
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.services import ocr_pool
+from app.services.tor_pages import extract_pages
+
+GRADE = re.compile(r'\b[123]\.\d{2}\b')
+PAGE_W, PAGE_H = 612, 792
+
+
+def tor_lines(rng: np.random.Generator, rows: int = 30):
+    lines = ['TRANSCRIPT OF RECORDS', 'Bachelor of Science in Information Technology', '']
+    for r in range(rows):
+        grade = rng.choice(['1.00', '1.25', '1.50', '1.75', '2.00', '2.25', '2.50', '2.75', '3.00'])
+        lines.append(f'IT {100 + r}   Course Title Number {r + 1}   3.0   {grade}')
+    return lines
+
+
+def scanned_jpeg(lines) -> bytes:
+    img = Image.new('RGB', (PAGE_W * 2, PAGE_H * 2), 'white')
+    draw = ImageDraw.Draw(img)
+    for n, line in enumerate(lines):
+        draw.text((80, 80 + n * 44), line, fill='black')
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=80)
+    return buf.getvalue()
+
+
+def build_pdf(pages) -> bytes:
+    """Minimal PDF writer: ('text', lines) pages get a Helvetica text layer, ('scan', jpeg) pages an image only."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    pages_id = len(objects) + 1 + 2 * len(pages) + sum(1 for kind, _ in pages if kind == 'scan')
+    kids = []
+    for kind, payload in pages:
+        if kind == 'text':
+            ops = ['BT /F1 10 Tf 14 TL 50 740 Td']
+            for line in payload:
+                ops.append('(%s) Tj T*' % line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)'))
+            ops.append('ET')
+            stream = '\n'.join(ops).encode('latin-1')
+            resources = b'<< /Font << /F1 %d 0 R >> >>' % font
+        else:
+            img = add(b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+                      b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n' % (PAGE_W * 2, PAGE_H * 2, len(payload))
+                      + payload + b'\nendstream')
+            stream = b'q %d 0 0 %d 0 0 cm /Im0 Do Q' % (PAGE_W, PAGE_H)
+            resources = b'<< /XObject << /Im0 %d 0 R >> >>' % img
+        content = add(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        kids.append(add(b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>'
+                        % (pages_id, PAGE_W, PAGE_H, resources, content)))
+    assert add(b'<< /Type /Pages /Kids [%s] /Count %d >>'
+               % (b' '.join(b'%d 0 R' % k for k in kids), len(kids))) == pages_id
+    catalog = add(b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % n + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for off in offsets:
+        out.write(b'%010d 00000 n \n' % off)
+    out.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, catalog, xref))
+    return out.getvalue()
+
+
+def corpus(docs: int, pages: int, text_ratio: float, rng: np.random.Generator):
+    out = []
+    for _ in range(docs):
+        spec = []
+        for _ in range(pages):
+            lines = tor_lines(rng)
+            spec.append(('text', lines) if rng.random() < text_ratio else ('scan', scanned_jpeg(lines)))
+        out.append(build_pdf(spec))
+    return out
+
+
+class SimulatedReader:
+    """Fixed-cost stand-in for EasyOCR when its weights are not available."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def readtext(self, image):
+        time.sleep(self.seconds)
+        return []
+
+
+def run(pdfs, use_text_layer: bool):
+    started = time.perf_counter()
+    methods = {'text': 0, 'ocr': 0}
+    grades = []
+    for pdf in pdfs:
+        pages = extract_pages(pdf, use_text_layer=use_text_layer)
+        for page in pages:
+            methods[page['method']] += 1
+        grades.append(GRADE.findall(' '.join(page['text'] for page in pages)))
+    return time.perf_counter() - started, methods, grades
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--docs', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=4)
+    parser.add_argument('--ratios', default='1,0.75,0.5,0')
+    parser.add_argument('--simulated-ocr-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    if args.simulated_ocr_ms is not None:
+        ocr_pool._pool = ocr_pool.OcrReaderPool(reader_factory=lambda: SimulatedReader(args.simulated_ocr_ms / 1000.0))
+        print(f'OCR simulated at {args.simulated_ocr_ms:g} ms/page; grade agreement not checked')
+    pool = ocr_pool.get_ocr_pool()
+    pool.warm()
+
+    rng = np.random.default_rng(0)
+    print(f"{'text pages':>10} {'ocr all p/s':>12} {'text layer p/s':>15} {'speedup':>8} {'ocr pages':>10} {'grades agree':>13}")
+    for ratio in [float(r) for r in args.ratios.split(',')]:
+        pdfs = corpus(args.docs, args.pages, ratio, rng)
+        total = args.docs * args.pages
+        base_s, _, base_grades = run(pdfs, use_text_layer=False)
+        fast_s, methods, fast_grades = run(pdfs, use_text_layer=True)
+        agree = '-' if args.simulated_ocr_ms is not None else f'{sum(a == b for a, b in zip(base_grades, fast_grades))}/{len(pdfs)}'
+        print(f'{ratio:>10.0%} {total / base_s:>12.1f} {total / fast_s:>15.1f} {base_s / fast_s:>7.1f}x '
+              f"{methods['ocr']:>10} {agree:>13}")
+    print(f"pool: {pool.stats()}")
+
+
+if __name__ == '__main__':
+    main()
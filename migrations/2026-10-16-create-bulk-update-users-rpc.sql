@@ -0,0 +1,42 @@
+-- Bulk update of the denormalized result columns on public.users.
+-- Takes a JSON array of {"id": .., "<column>": ..} objects and applies every row
+-- in one UPDATE ... FROM statement. A column is only changed for rows whose
+-- object carries that key; other columns and rows without a match are left alone.
+-- (An upsert cannot be used for this: its insert half trips the NOT NULL
+-- columns such as first_name/password_hash.)
+
+create or replace function public.bulk_update_users(payload jsonb)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  updated_count integer := 0;
+begin
+  update public.users u
+  set
+    career_forecast_analyzed_at = case when r.doc ? 'career_forecast_analyzed_at' then p.career_forecast_analyzed_at else u.career_forecast_analyzed_at end,
+    career_top_jobs = case when r.doc ? 'career_top_jobs' then p.career_top_jobs else u.career_top_jobs end,
+    career_top_jobs_scores = case when r.doc ? 'career_top_jobs_scores' then p.career_top_jobs_scores else u.career_top_jobs_scores end,
+    job_recommendations = case when r.doc ? 'job_recommendations' then p.job_recommendations else u.job_recommendations end,
+    archetype_analyzed_at = case when r.doc ? 'archetype_analyzed_at' then p.archetype_analyzed_at else u.archetype_analyzed_at end,
+    primary_archetype = case when r.doc ? 'primary_archetype' then p.primary_archetype else u.primary_archetype end,
+    archetype_realistic_percentage = case when r.doc ? 'archetype_realistic_percentage' then p.archetype_realistic_percentage else u.archetype_realistic_percentage end,
+    archetype_investigative_percentage = case when r.doc ? 'archetype_investigative_percentage' then p.archetype_investigative_percentage else u.archetype_investigative_percentage end,
+    archetype_artistic_percentage = case when r.doc ? 'archetype_artistic_percentage' then p.archetype_artistic_percentage else u.archetype_artistic_percentage end,
+    archetype_social_percentage = case when r.doc ? 'archetype_social_percentage' then p.archetype_social_percentage else u.archetype_social_percentage end,
+    archetype_enterprising_percentage = case when r.doc ? 'archetype_enterprising_percentage' then p.archetype_enterprising_percentage else u.archetype_enterprising_percentage end,
+    archetype_conventional_percentage = case when r.doc ? 'archetype_conventional_percentage' then p.archetype_conventional_percentage else u.archetype_conventional_percentage end
+  from jsonb_array_elements(payload) as r(doc)
+  cross join lateral jsonb_populate_record(null::public.users, r.doc) as p
+  where u.id = p.id;
+
+  get diagnostics updated_count = row_count;
+  return updated_count;
+end;
+$$;
+
+-- Functions are executable by PUBLIC by default; only the backend may call this one
+revoke execute on function public.bulk_update_users(jsonb) from public, anon, authenticated;
+grant execute on function public.bulk_update_users(jsonb) to service_role;
@@ -0,0 +1,67 @@
+-- Cohort analytics aggregates for admin dashboards
+-- Dashboards read O(course x cohort) rows from these materialized views instead
+-- of scanning every user. Cohort = entry year taken from student_number
+-- (e.g. '2021-00123' -> '2021'); anything else groups under 'unknown'.
+-- The backend calls refresh_cohort_analytics() (debounced) after objective 1/2
+-- writes and on a fixed interval.
+
+create materialized view if not exists public.analytics_archetype_by_cohort as
+select
+  coalesce(nullif(trim(u.course), ''), 'unknown') as course,
+  coalesce(substring(u.student_number from '^\s*(\d{4})'), 'unknown') as cohort,
+  count(*) as students,
+  count(u.primary_archetype) as analyzed,
+  count(*) filter (where u.primary_archetype = 'realistic') as realistic_count,
+  count(*) filter (where u.primary_archetype = 'investigative') as investigative_count,
+  count(*) filter (where u.primary_archetype = 'artistic') as artistic_count,
+  count(*) filter (where u.primary_archetype = 'social') as social_count,
+  count(*) filter (where u.primary_archetype = 'enterprising') as enterprising_count,
+  count(*) filter (where u.primary_archetype = 'conventional') as conventional_count,
+  round(avg(u.archetype_realistic_percentage), 2) as avg_realistic_percentage,
+  round(avg(u.archetype_investigative_percentage), 2) as avg_investigative_percentage,
+  round(avg(u.archetype_artistic_percentage), 2) as avg_artistic_percentage,
+  round(avg(u.archetype_social_percentage), 2) as avg_social_percentage,
+  round(avg(u.archetype_enterprising_percentage), 2) as avg_enterprising_percentage,
+  round(avg(u.archetype_conventional_percentage), 2) as avg_conventional_percentage,
+  count(*) filter (where coalesce(array_length(u.career_top_jobs, 1), 0) > 0) as forecasted,
+  now() as refreshed_at
+from public.users u
+group by 1, 2;
+
+create unique index if not exists analytics_archetype_by_cohort_key
+  on public.analytics_archetype_by_cohort (course, cohort);
+
+create materialized view if not exists public.analytics_top_jobs_by_cohort as
+select
+  coalesce(nullif(trim(u.course), ''), 'unknown') as course,
+  coalesce(substring(u.student_number from '^\s*(\d{4})'), 'unknown') as cohort,
+  j.job,
+  count(*) as students,
+  count(*) filter (where j.rank = 1) as top1_students,
+  round(avg(u.career_top_jobs_scores[j.rank]), 4) as avg_score
+from public.users u
+cross join lateral unnest(u.career_top_jobs) with ordinality as j(job, rank)
+group by 1, 2, 3;
+
+create unique index if not exists analytics_top_jobs_by_cohort_key
+  on public.analytics_top_jobs_by_cohort (course, cohort, job);
+create index if not exists analytics_top_jobs_by_cohort_rank
+  on public.analytics_top_jobs_by_cohort (course, cohort, students desc);
+
+-- Concurrent refresh keeps the views readable while they rebuild
+create or replace function public.refresh_cohort_analytics()
+returns timestamptz
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  refresh materialized view concurrently public.analytics_archetype_by_cohort;
+  refresh materialized view concurrently public.analytics_top_jobs_by_cohort;
+  return now();
+end;
+$$;
+
+grant select on public.analytics_archetype_by_cohort, public.analytics_top_jobs_by_cohort to service_role;
+revoke execute on function public.refresh_cohort_analytics() from public, anon, authenticated;
+grant execute on function public.refresh_cohort_analytics() to service_role;